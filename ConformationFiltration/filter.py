@@ -8,6 +8,26 @@ import matplotlib.pyplot as plt
 import tempfile
 import random
 import time
+import json
+import hashlib
+import pickle
+import struct
+import mmap
+import itertools
+import bisect
+import re
+import array
+import collections.abc
+import multiprocessing
+import threading
+import queue
+from multiprocessing import shared_memory
+
+# optional, used for vectorized calculations
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 FEATURES = [
@@ -68,6 +88,19 @@ FEATURES = [
     'version 4.0.1  : add more calculation type in Check',
     'version 4.1.0  : add report of execution time',
     'version 4.2.0  : prompt check on memory usage overhead',
+    'version 4.3.0  : add connection mode in Filtration',
+    'version 4.4.0  : add follow mode on growing data files',
+    'version 4.5.0  : add shared memory parallel descriptors calculation',
+    'version 4.6.0  : add compact container CompactSystem',
+    'version 4.7.0  : add persistent cache for perception results',
+    'version 4.8.0  : PlotSamples reuses descriptors, samples in parallel',
+    'version 4.9.0  : add binary probability data file',
+    'version 4.10.0 : add downsampling for plots',
+    'version 4.11.0 : add quota mode in Filtration',
+    'version 4.12.0 : add pipelined bulk process',
+    'version 4.13.0 : add checkpoint and resume for bulk process',
+    'version 4.14.0 : add saturation analysis on data files',
+    'version 4.15.0 : add bulk parsing on regular layout in ReadFile',
 ]
 
 VERSION = FEATURES[-1].split(':')[0].replace('version',' ').strip()
@@ -310,24 +343,115 @@ class AtomInfo:
 FAI = AtomInfo()
 
 
+# regular layout in data files, used for fast bulk parsing
+BLANKLINE = re.compile(r'\n(?:[ \t\r\f\v]*\n)+')
+HEADLINE = re.compile(r'\n(?=[ \t]*#)')
+ATOMLINES = re.compile(r'(?:[ \t]*\S+[ \t]+\S+[ \t]+\S+[ \t]+\S+[ \t\r]*(?:\n|$))+')
+
+
+class CompactSystem(collections.abc.Sequence):
+    """compact container for molecules in same atomtypes
+
+    Args:
+        atypes (List[str]): shared atomtypes for all molecules
+        typecode (str): 'd' for float64, 'f' for float32, default 'd'
+
+    Attributes:
+        atypes   : 1D List[str]
+        natoms   : int
+        coords   : array : flatten coordinates on (n_mol, n_atom, 3)
+        energies : array : float64, NaN means not exist
+
+    Note:
+        it works like 3D List[ List[[atomtype, x,y,z], ...], ...], while
+        each molecule is generated on the fly, thus modification on it will
+        not change the container, slicing returns a new container
+    """
+    def __init__(self,atypes=None,typecode=None,*args,**kwargs):
+        self.atypes = [] if atypes is None else [i for i in atypes]
+        self.natoms = len(self.atypes)
+        self.typecode = 'f' if typecode == 'f' else 'd'
+        self.coords = array.array(self.typecode)
+        self.energies = array.array('d')
+
+    def __len__(self):
+        return len(self.energies)
+
+    def __getitem__(self,ndx):
+        if isinstance(ndx,slice):
+            return self.take(range(*ndx.indices(len(self))))
+        if ndx < 0: ndx += len(self)
+        if ndx < 0 or ndx >= len(self): raise IndexError('index out of range')
+        beg = ndx * self.natoms * 3
+        xyz = self.coords[beg:beg+self.natoms*3].tolist()
+        # remove round-off errors on float32
+        if self.typecode == 'f': xyz = [float('{:.7g}'.format(v)) for v in xyz]
+        return [[t,xyz[3*i],xyz[3*i+1],xyz[3*i+2]] for i,t in enumerate(self.atypes)]
+
+    @property
+    def energy(self):
+        """1D List[float] : None means not exist"""
+        return [None if math.isnan(v) else v for v in self.energies]
+
+    def append(self,mol,energy=None):
+        if not self.natoms and not len(self):
+            self.atypes = [at[0] for at in mol]
+            self.natoms = len(self.atypes)
+        if len(mol) != self.natoms:
+            raise ValueError('number of atoms are not cooresponded')
+        self.coords.extend([v for at in mol for v in at[1:4]])
+        self.energies.append(float('nan') if energy is None else energy)
+
+    def extend(self,system,energy=None):
+        """system can be CompactSystem or 3D List"""
+        if isinstance(system,CompactSystem):
+            if not self.natoms and not len(self):
+                self.atypes = [i for i in system.atypes]
+                self.natoms = system.natoms
+            if system.atypes != self.atypes:
+                raise ValueError('atomtypes are not cooresponded')
+            self.coords.extend(system.coords)
+            self.energies.extend(system.energies)
+        else:
+            for i,mol in enumerate(system):
+                self.append(mol,None if energy is None else energy[i])
+
+    def take(self,ndxlist):
+        """return new CompactSystem on index list"""
+        new = CompactSystem(self.atypes,self.typecode)
+        n = self.natoms * 3
+        for i in ndxlist:
+            new.coords.extend(self.coords[i*n:(i+1)*n])
+            new.energies.append(self.energies[i])
+        return new
+
+    def getsizeof(self):
+        return sys.getsizeof(self.coords) + sys.getsizeof(self.energies) + \
+               sum([sys.getsizeof(i) for i in self.atypes])
+
+
 class ReadFile:
     """
     Args:
         file (str): input file name
         ext (str): txt | xsf | xyz
         debug (bool): whether printout more info
+        compact (bool): whether save system to CompactSystem
+        typecode (str): valid for compact, 'd' for float64, 'f' for float32
 
     Attributes:
-        system : 3D List[ List[[atomtype, x,y,z], ...], ...]
+        system : 3D List[ List[[atomtype, x,y,z], ...], ...]  |  CompactSystem
         energy : 1D List[float]  :   None means not exist
     """
-    def __init__(self,file,ext=None,debug=True,*args,**kwargs):
+    def __init__(self,file,ext=None,debug=True,compact=None,typecode=None,*args,**kwargs):
         self.nice = True
         self.info = ''
         self.file = file
         self.system = []
         self.energy = []
         self.debug = True if debug is True else False
+        self.compact = True if compact is True else False
+        self.typecode = typecode
 
         # decide file format
         if ext is None:
@@ -344,9 +468,11 @@ class ReadFile:
             self.info = 'Fatal: file not support: {:}'.format(self.file)
             return
 
-    def run(self):
+    def run(self,profile=None):
         """process input file
 
+        profile (List[str]): optional, lines to be processed rather than file
+
         require:
             atomtype entry can be mixed, which means,
 
@@ -356,31 +482,22 @@ class ReadFile:
             they are equivalent
         """
         if self.debug: print('Note: reading data from file: {:}'.format(self.file))
-        prolist,enelist,errlist = getattr(self,'read_'+self.ext)()
+        if profile is None and self.read_bulk(): return
+        prolist,enelist,errlist = getattr(self,'read_'+self.ext)(profile)
         if not len(prolist): return
 
         if self.debug:
             for i in errlist:
                 print('Warning: ignoring: {:}: {:}'.format(i[0],i[1]))
 
-        # format: 2D str: [ [sign, number, name], ... ]
-        atominfo = [[i[0], str(i[1]), i[4]] for i in FAI.atominfo]
-
-        ndxlist = []
-        for i in prolist[0]:
-            atype = i[0].capitalize()
-            bo = True
-            for ndx in atominfo:
-                if atype in ndx:
-                    bo = False
-                    atype = ndx[0]
-                    break
-            if bo: atype = i[0]
-            ndxlist.append(atype)
+        ndxlist = self.get_atomtypes([i[0] for i in prolist[0]])
 
         nats = len(ndxlist)
+        if self.compact: self.system = CompactSystem(ndxlist,self.typecode)
         errlist = []
         for n,mol in enumerate(prolist):
+            # release memory as soon as possible
+            if self.compact: prolist[n] = None
             if len(mol) != nats:
                 info = 'Warning: ignoring: error: number of atoms'
                 errlist.append([info,mol])
@@ -392,23 +509,18 @@ class ReadFile:
             bo = True
             for cnt,atom in enumerate(mol):
                 if atom[0] != ndxlist[cnt]:
-                    bo = False
-                    atype = atom[0].capitalize()
-                    for ndx in atominfo:
-                        if atype in ndx:
-                            bo = True
-                            atype = ndx[0]
-                            break
-                    if bo:
-                        if atype == ndxlist[cnt]:
-                            atom[0] = atype
-                        else:
-                            bo = False
-                    if not bo:
+                    atype = self.get_atomtype(atom[0])
+                    if atype == ndxlist[cnt]:
+                        atom[0] = atype
+                    else:
+                        bo = False
                         break
             if bo:
                 self.energy.append(enelist[n])
-                self.system.append(mol)
+                if self.compact:
+                    self.system.append(mol,enelist[n])
+                else:
+                    self.system.append(mol)
             else:
                 info = 'Warning: ignoring: error: not cooresponded'
                 errlist.append([info,mol])
@@ -419,9 +531,116 @@ class ReadFile:
                 for j in i[1]: print(j)
                 print()
 
-    def read_xsf(self):
+    def get_atomtype(self,atype):
+        """real atomtype sign for atomtype entry, None if not found
+
+        results are cached, since entries are highly repeated in data files
+        """
+        if not hasattr(self,'typemap'):
+            # format: 2D str: [ [sign, number, name], ... ]
+            self.atominfo = [[i[0], str(i[1]), i[4]] for i in FAI.atominfo]
+            self.typemap = {}
+        if atype not in self.typemap:
+            sign = None
+            name = atype.capitalize()
+            for ndx in self.atominfo:
+                if name in ndx:
+                    sign = ndx[0]
+                    break
+            self.typemap[atype] = sign
+        return self.typemap[atype]
+
+    def get_atomtypes(self,atypes):
+        """real atomtypes for the reference molecule, unknown keeps as it is"""
+        ndxlist = []
+        for i in atypes:
+            atype = self.get_atomtype(i)
+            ndxlist.append(i if atype is None else atype)
+        return ndxlist
+
+    def read_bulk(self):
+        """fast path for regular layout, molecules are parsed in bulk
+
+        Rule:
+            only regular layout is accepted, every atom line has exactly
+            four entries, all molecules have the same atomtype entries,
+            for compact, coordinates are directly extended to CompactSystem
+
+        Return:
+            bool : False means irregular layout is found, nothing is saved,
+                   per-line parser has to be used for warnings on it
+        """
         with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+            text = f.read().strip()
+        if not len(text): return False
+
+        if self.ext == 'xsf':
+            # blank lines are meaningless in xsf
+            blocks = HEADLINE.split(BLANKLINE.sub('\n',text))
+            if blocks[0].lstrip()[:1] != '#': blocks = blocks[1:]
+        else:
+            blocks = BLANKLINE.split(text)
+
+        rawtypes = None
+        system = []
+        energy = []
+        for block in blocks:
+            block = block.lstrip()
+            ene = None
+            ltmp = None
+            if self.ext == 'txt':
+                if block[0] == '#':
+                    ltmp, _, block = block.partition('\n')
+            else:
+                ltmp, _, block = block.partition('\n')
+                if self.ext == 'xyz':
+                    atomnum = ltmp.strip()
+                    ltmp, _, block = block.partition('\n')
+                else:
+                    head, _, block = block.partition('\n')
+                    if head.strip() != 'ATOMS': return False
+            if not ATOMLINES.fullmatch(block): return False
+            if ltmp is not None:
+                ltmp = ltmp.replace('=',' ').split()
+                if len(ltmp) >= 2:
+                    try:
+                        ene = float(ltmp[-1])
+                    except ValueError:
+                        pass
+
+            tok = block.split()
+            if rawtypes is None:
+                rawtypes = tok[0::4]
+                ndxlist = self.get_atomtypes(rawtypes)
+                nats = len(ndxlist)
+                if self.compact: system = CompactSystem(ndxlist,self.typecode)
+            elif tok[0::4] != rawtypes:
+                return False
+            if self.ext == 'xyz' and atomnum != str(nats):
+                try:
+                    if int(atomnum) != nats: return False
+                except ValueError:
+                    return False
+            del tok[0::4]
+            try:
+                if self.compact:
+                    system.coords.extend(map(float,tok))
+                    system.energies.append(float('nan') if ene is None else ene)
+                else:
+                    xyz = iter(tok)
+                    system.append([[t,float(x),float(y),float(z)] for t,x,y,z in zip(ndxlist,xyz,xyz,xyz)])
+            except ValueError:
+                return False
+            energy.append(ene)
+
+        self.system = system
+        self.energy = energy
+        return True
+
+    def read_xsf(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
         
         promol = []
         i = 0
@@ -497,9 +716,10 @@ class ReadFile:
 
         return prolist, enelist, errlist
 
-    def read_txt(self):
-        with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+    def read_txt(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
 
         # List[List[[atomtype, x, y, z], ...]]
         promol = []
@@ -558,9 +778,10 @@ class ReadFile:
 
         return prolist, enelist, errlist
 
-    def read_xyz(self):
-        with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+    def read_xyz(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
 
         # List[List[[atomtype, x, y, z], ...]]
         promol = []
@@ -636,7 +857,7 @@ class SaveFile:
     """opposite operation to ReadFile
 
     Args:
-        system : 3D List[ List[[atomtype, x,y,z], ...], ...]
+        system : 3D List[ List[[atomtype, x,y,z], ...], ...]  |  CompactSystem
         energy : 1D List[float]  :   None means not exist
 
         ftype (str): Output file type: txt | xsf | xyz
@@ -652,8 +873,9 @@ class SaveFile:
     def __init__(self,system,energy=None,ftype=None,fname=None,*args,**kwargs):
         self.nice = True
         self.info = ''
-        self.system = system if isinstance(system,list) else []
+        self.system = system if isinstance(system,(list,CompactSystem)) else []
         self.energy = energy if energy is not None and isinstance(energy,list) else []
+        if isinstance(system,CompactSystem) and energy is None: self.energy = system.energy
 
         if not len(self.system):
             self.nice = False
@@ -702,7 +924,9 @@ class SaveFile:
         # format: 2D: [ [sign, number-int, number-str, name], ... ]
         atominfo = [[i[0], i[1], str(i[1]), i[4]] for i in FAI.atominfo]
         self.atypelist = []
-        for mol in self.system:
+        # atomtypes are shared in CompactSystem
+        molist = [[[i] for i in self.system.atypes]] if isinstance(self.system,CompactSystem) else self.system
+        for mol in molist:
             ls = []
             for at in mol:
                 atype = at[0].capitalize() if isinstance(at,str) else at[0]
@@ -712,10 +936,12 @@ class SaveFile:
                         break
                 ls.append(atype)
             self.atypelist.append(ls)
+        if isinstance(self.system,CompactSystem): self.atypelist = self.atypelist * len(self.system)
 
-    def run(self):
+    def run(self,append=None):
         fout = getattr(self,'save_'+self.ftype)()
-        with open(self.fname,'wt') as f: f.write(fout)
+        mode = 'at' if append is True else 'wt'
+        with open(self.fname,mode) as f: f.write(fout)
 
     def save_xsf(self):
         fout = ''
@@ -1180,6 +1406,134 @@ class AnglePerception(BondPerception):
         return acon
 
 
+class PerceptionCache:
+    """persistent cache for AnglePerception results
+
+    Args:
+        path (str): cache directory, default ~/.cache/conformation-filtration
+        digits (int): coordinates are rounded on digits for key, default 2
+
+    Note:
+        key is sha1 of atomtypes sequence and rounded coordinates,
+        each result is saved as json file, index starts at 0
+    """
+    KEYS = ['conb', 'bcon', 'nconb', 'fconb', 'fnconb', 'cfnconb', 'fragments',
+            'cona', 'acon', 'ncona', 'fcona', 'fncona', 'cfnacon', 'cfncona']
+
+    def __init__(self,path=None,digits=None,*args,**kwargs):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'),'.cache','conformation-filtration')
+        self.path = path
+        self.digits = 2 if digits is None else digits
+
+    def get_key(self,system):
+        """system : single: 2D List[[atomtype, x,y,z], ...]"""
+        txt = 'perception-v1\n'
+        for at in system:
+            ls = ['{:.{:}f}'.format(v,self.digits) for v in at[1:4]]
+            # avoid negative zero
+            ls = [v[1:] if not float(v) and v[0] == '-' else v for v in ls]
+            txt += '{:} {:} {:} {:}\n'.format(at[0],*ls)
+        return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+    def load(self,fn):
+        """update attributes of AnglePerception fn from cache
+
+        Return:
+            True if cache is found, otherwise, False
+        """
+        file = os.path.join(self.path,self.get_key(fn.system)+'.json')
+        if not os.path.isfile(file): return False
+        try:
+            with open(file,'rt') as f: data = json.load(f)
+        except (OSError,ValueError):
+            return False
+        if not all([k in data for k in self.KEYS]): return False
+        for k in self.KEYS: setattr(fn,k,data[k])
+        return True
+
+    def save(self,fn):
+        file = os.path.join(self.path,self.get_key(fn.system)+'.json')
+        data = {k:getattr(fn,k) for k in self.KEYS}
+        try:
+            os.makedirs(self.path,exist_ok=True)
+            with open(file,'wt') as f: json.dump(data,f)
+        except OSError:
+            print('Warning: cannot write perception cache < {:} >'.format(file))
+            return False
+        return True
+
+
+class Checkpoint:
+    """checkpoint for long BulkProcess, so that it can be resumed
+
+    Args:
+        path (str): checkpoint directory, default filter-checkpoint
+        boresume (bool): if True, completed stages are reused, otherwise,
+                         old checkpoint is removed
+
+    Rule:
+        stages are saved in sequence:
+            1) parsed data for each input file, key on path, size & mtime
+            2) descriptors for all molecules, key on files & connections
+            3) reference list, key on descriptors & filtration settings
+
+        data of each stage is saved as pickle file, keys of completed stages
+        are recorded in manifest.json, stage will be calculated again
+        when its key is changed
+    """
+    VERSION = 'checkpoint-v1'
+
+    def __init__(self,path=None,boresume=None,*args,**kwargs):
+        self.path = 'filter-checkpoint' if path is None else path
+        self.manifest = {}
+        self.fmanifest = os.path.join(self.path,'manifest.json')
+        if os.path.isfile(self.fmanifest):
+            try:
+                with open(self.fmanifest,'rt') as f: self.manifest = json.load(f)
+            except (OSError,ValueError):
+                print('Warning: broken checkpoint manifest < {:} >, ignoring'.format(self.fmanifest))
+                self.manifest = {}
+        if boresume is not True:
+            for name in self.manifest:
+                file = os.path.join(self.path,name+'.pkl')
+                if os.path.isfile(file): os.remove(file)
+            self.manifest = {}
+
+    def get_key(self,*args):
+        txt = json.dumps([self.VERSION,*args],sort_keys=True,default=str)
+        return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+    def get_filekey(self,file,*args):
+        st = os.stat(file)
+        return self.get_key(os.path.abspath(file),st.st_size,st.st_mtime_ns,*args)
+
+    def load(self,name,key):
+        """Return: saved data, or None when stage is not completed"""
+        if name not in self.manifest or self.manifest[name] != key: return None
+        file = os.path.join(self.path,name+'.pkl')
+        try:
+            with open(file,'rb') as f: data = pickle.load(f)
+        except (OSError,EOFError,pickle.UnpicklingError):
+            return None
+        return data
+
+    def save(self,name,key,data):
+        """files are written to temporary firstly, interruption will not break them"""
+        file = os.path.join(self.path,name+'.pkl')
+        try:
+            os.makedirs(self.path,exist_ok=True)
+            with open(file+'.tmp','wb') as f: pickle.dump(data,f,protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(file+'.tmp',file)
+            self.manifest[name] = key
+            with open(self.fmanifest+'.tmp','wt') as f: json.dump(self.manifest,f,indent=2)
+            os.replace(self.fmanifest+'.tmp',self.fmanifest)
+        except OSError:
+            print('Warning: cannot write checkpoint < {:} >'.format(file))
+            return False
+        return True
+
+
 def test_class_Perception():
     def checkrepeats(mylist):
         for i,ref in enumerate(mylist):
@@ -1394,11 +1748,23 @@ class Filtration:
         btol : tolerance on bond, Angstrom
         atol : tolerance on angle, degree
 
+        mode : {dynamic, static, connection} : default dynamic
+            connection  :  molecules are repeats only when every connection
+                           in bcon & acon is within btol & atol
+
         obpar  :  Boolean  :  whether calculate bonds prob_bpar  :  default False
         oball  :  Boolean  :  whether calculate bonds prob_ball  :  default True
         oapar  :  Boolean  :  whether calculate angles prob_apar  :  default False
         oaall  :  Boolean  :  whether calculate angles prob_aall  :  default True
 
+        nproc  :  int  :  number of processes for descriptors calculation  :  default 1
+
+        quota  :  int  :  if set, exactly quota molecules are kept by farthest point
+                          sampling, keepndxlist are seeds, not counted, highest priority
+
+        prebondlist  :  2D  :  List[ List[float] ]  :  optional, precalculated on bcon
+        preanglelist :  2D  :  List[ List[float] ]  :  optional, precalculated on acon
+        prereflist   :  1D  :  List[int]  :  optional, precalculated reflist
 
     Attributes:
         system  :  good molecules after filtration
@@ -1427,8 +1793,8 @@ class Filtration:
     def __init__(self,system=None,keepndxlist=None,userinputs=None,
                 bcon=None,acon=None,btol=None,atol=None,seed=None,
                 mode=None,vndx=None,borandom=None,boall=None,
-                obpar=None,oball=None,oapar=None,oaall=None,
-                *args,**kwargs):
+                obpar=None,oball=None,oapar=None,oaall=None,nproc=None,
+                prebondlist=None,preanglelist=None,prereflist=None,quota=None,*args,**kwargs):
         self.system = system
         self.keepndxlist = keepndxlist
         self.userinputs = True if userinputs is True else False
@@ -1443,8 +1809,12 @@ class Filtration:
 
         if mode is None or mode.lower() in ['d','dynamic']:
             self.mode = 'dynamic'
+        elif mode.lower() in ['c','connection']:
+            self.mode = 'connection'
         else:
             self.mode = 'static'
+        self.quota = quota if quota and quota > 0 else None
+        if self.quota: self.mode = 'quota'
         self.vndx = vndx
         self.borandom = borandom
         self.boall = True if boall is None else boall
@@ -1453,6 +1823,10 @@ class Filtration:
         self.oball = False if oball is False else True
         self.oapar = True if oapar is True else False
         self.oaall = False if oaall is False else True
+        self.nproc = nproc if nproc and nproc > 1 else 1
+        self.prebondlist = prebondlist
+        self.preanglelist = preanglelist
+        self.prereflist = prereflist
 
         if self.userinputs:
             self.userinputs = False
@@ -1465,10 +1839,17 @@ class Filtration:
         """attemption on filtering
         """
         # to improve efficiency, bondlist only needs to be calculated once
-        if len(self.bcon): print('Note: calculating bonds connections ...')
-        bondlist = self.calc_square_distance(self.system,self.bcon)
-        if len(self.acon): print('Note: calculating angles connections ...')
-        anglelist = self.calc_angle_degree(self.system,self.acon)
+        if self.prebondlist is not None or self.preanglelist is not None:
+            bondlist = [] if self.prebondlist is None else self.prebondlist
+            anglelist = [] if self.preanglelist is None else self.preanglelist
+        elif self.nproc > 1 and len(self.system) >= self.nproc:
+            print('Note: calculating connections on < {:} > processes ...'.format(self.nproc))
+            bondlist,anglelist = self.calc_descriptors_parallel(self.system,self.bcon,self.acon,self.nproc)
+        else:
+            if len(self.bcon): print('Note: calculating bonds connections ...')
+            bondlist = self.calc_square_distance(self.system,self.bcon)
+            if len(self.acon): print('Note: calculating angles connections ...')
+            anglelist = self.calc_angle_degree(self.system,self.acon)
 
         # increments
         binc = self.btol * self.btol
@@ -1484,15 +1865,19 @@ class Filtration:
         if self.oapar or self.oaall:
             print('Note: calculating begin angles probability ...')
             self.prob_begin['apar'], self.prob_begin['aall'] = self.calc_probs(anglelist,ainc,self.oapar,self.oaall)
-        print('Note: calculating repeats reference ...')
-        self.reflist = self.calc_filterlists(bondlist,anglelist,binc,ainc,mode=self.mode,vndx=self.vndx,
-                                            borandom=self.borandom,boall=self.boall,keepndxlist=self.keepndxlist)
+        if self.prereflist is not None:
+            self.reflist = list(self.prereflist)
+        else:
+            print('Note: calculating repeats reference ...')
+            self.reflist = self.calc_filterlists(bondlist,anglelist,binc,ainc,mode=self.mode,vndx=self.vndx,
+                                                borandom=self.borandom,boall=self.boall,
+                                                keepndxlist=self.keepndxlist,quota=self.quota)
         
         print('Note: updating ...')
-        tmpsys = []
+        goodlist = []
+        badlist = []
         self.bondlist = []
         self.anglelist = []
-        self.sysbad = []
         cnt = 0
         trn = 0
         self.reflist.append(-1)
@@ -1500,14 +1885,20 @@ class Filtration:
         for ndx in range(len(self.system)):
             if ndx == self.reflist[cnt]:
                 cnt += 1
-                self.sysbad.append(self.system[ndx])
+                badlist.append(ndx)
             else:
                 if ndx == self.keepndxlist[trn]:
                     trn += 1
                 else:
-                    tmpsys.append(self.system[ndx])
+                    goodlist.append(ndx)
                     if len(bondlist): self.bondlist.append(bondlist[ndx])
                     if len(anglelist): self.anglelist.append(anglelist[ndx])
+        if isinstance(self.system,CompactSystem):
+            tmpsys = self.system.take(goodlist)
+            self.sysbad = self.system.take(badlist)
+        else:
+            tmpsys = [self.system[i] for i in goodlist]
+            self.sysbad = [self.system[i] for i in badlist]
         self.fratio = 1.0 - len(tmpsys)/len(self.system)
         # alias
         self.system = tmpsys
@@ -1618,7 +2009,7 @@ class Filtration:
         return prob_par, prob_all
 
     def calc_filterlists(self,bondlist,anglelist,binc,ainc,mode=None,vndx=None,
-                        borandom=None,boall=None,keepndxlist=None):
+                        borandom=None,boall=None,keepndxlist=None,quota=None):
         """
         Rule:
             Since the variance is only based on the single movement,
@@ -1630,7 +2021,11 @@ class Filtration:
         Return:
             reflist  :  List[int]  :  index of molecules waiting to be removed
         """
+        if quota:
+            return self._calc_filterlists_quota(bondlist,anglelist,binc,ainc,keepndxlist,quota)
         if len(bondlist) <= 3 and len(anglelist) <= 3: return []
+        if mode is not None and mode.lower() in ['connection','c']:
+            return self._calc_filterlists_connection(bondlist,anglelist,binc,ainc,keepndxlist)
         bl = [sum(i) for i in bondlist]
         al = [sum(i) for i in anglelist]
         if mode is None or mode.lower() in ['dynamic','d']:
@@ -1812,6 +2207,142 @@ class Filtration:
                         reflist.extend(ls[1:])
         return sorted(reflist)
 
+    def _calc_filterlists_connection(self,bondlist,anglelist,binc,ainc,keepndxlist,nkey=None):
+        """Molecules are repeats only when every connection is within tolerance
+
+        Rule:
+            descriptor of each molecule is its per-connection vector,
+            [b1, b2, ..., a1, a2, ...], on bond length (Angstrom) and angle
+            (degree), two molecules are repeats only when for all entries,
+
+                |bi - bi'| < btol     and     |ai - ai'| < atol
+
+            to avoid pairwise comparisons, descriptors are scaled by their
+            tolerance and hashed to unit grids on nkey entries which have
+            the largest spreads, so only neighbor grids need to be checked.
+
+            molecules in keepndxlist are always put in grids first, others
+            are processed by their sequence, the latter one will be removed
+
+        Return:
+            reflist  :  List[int]  :  sorted index of molecules to be removed
+        """
+        if nkey is None: nkey = 3
+        if keepndxlist is None: keepndxlist = []
+        tot = max(len(bondlist),len(anglelist))
+        btol = pow(binc,0.5)
+
+        desc = []
+        for i in range(tot):
+            ls = [pow(v,0.5)/btol for v in bondlist[i]] if len(bondlist) else []
+            if len(anglelist): ls.extend([v/ainc for v in anglelist[i]])
+            desc.append(ls)
+        nd = len(desc[0])
+        if not nd: return []
+
+        # choose entries with the largest spreads as grid keys
+        spread = []
+        for k in range(nd):
+            ls = [v[k] for v in desc]
+            spread.append(max(ls)-min(ls))
+        keys = sorted(range(nd),key=lambda k: spread[k],reverse=True)[:nkey]
+        offsets = list(itertools.product([-1,0,1],repeat=len(keys)))
+
+        grids = {}
+        def checkin(ndx):
+            v = desc[ndx]
+            g = [math.floor(v[k]) for k in keys]
+            for off in offsets:
+                pos = tuple([t+off[i] for i,t in enumerate(g)])
+                if pos not in grids: continue
+                for c in grids[pos]:
+                    u = desc[c]
+                    for k in range(nd):
+                        if abs(v[k]-u[k]) >= 1.0: break
+                    else:
+                        return True
+            pos = tuple(g)
+            if pos in grids:
+                grids[pos].append(ndx)
+            else:
+                grids[pos] = [ndx]
+            return False
+
+        keepset = set(keepndxlist)
+        for ndx in sorted(keepset):
+            pos = tuple([math.floor(desc[ndx][k]) for k in keys])
+            if pos in grids:
+                grids[pos].append(ndx)
+            else:
+                grids[pos] = [ndx]
+        reflist = []
+        for ndx in range(tot):
+            if ndx in keepset: continue
+            if checkin(ndx): reflist.append(ndx)
+        return reflist
+
+    def _calc_filterlists_quota(self,bondlist,anglelist,binc,ainc,keepndxlist,quota):
+        """Keep exactly quota molecules by farthest point sampling
+
+        Rule:
+            descriptors are the same as connection mode, scaled by tolerance,
+            molecules in keepndxlist are only seeds of distances, they are
+            not counted in quota, without them, the first molecule is chosen,
+            then each time, the one farthest from all selections is chosen,
+            until quota new molecules are chosen,
+
+            complexity is O(n*quota), vectorized when numpy is available
+
+        Return:
+            reflist  :  List[int]  :  sorted index of molecules to be removed
+        """
+        if keepndxlist is None: keepndxlist = []
+        tot = max(len(bondlist),len(anglelist))
+        keepset = set(keepndxlist)
+        # keeps are reference, they are not in results
+        if tot - len(keepset) <= quota: return []
+        btol = pow(binc,0.5)
+
+        desc = []
+        for i in range(tot):
+            ls = [pow(v,0.5)/btol for v in bondlist[i]] if len(bondlist) else []
+            if len(anglelist): ls.extend([v/ainc for v in anglelist[i]])
+            desc.append(ls)
+
+        chosen = []
+        if np is not None:
+            data = np.array(desc,dtype=float)
+            mind = np.full(tot,np.inf)
+            for k in keepset: mind = np.minimum(mind,((data-data[k])**2).sum(axis=1))
+            mask = np.zeros(tot,dtype=bool)
+            mask[list(keepset)] = True
+            for n in range(quota):
+                mind[mask] = -1.0
+                k = 0 if n == 0 and not len(keepset) else int(np.argmax(mind))
+                chosen.append(k)
+                mask[k] = True
+                mind = np.minimum(mind,((data-data[k])**2).sum(axis=1))
+        else:
+            # column-wise to reduce python overheads
+            cols = list(zip(*desc)) if len(desc[0]) else []
+            mind = [float('inf') for i in range(tot)]
+            def update(mind,k):
+                dist = [0.0 for i in range(tot)]
+                for col in cols:
+                    v = col[k]
+                    dist = [d+(t-v)*(t-v) for d,t in zip(dist,col)]
+                return [d if d < m else m for d,m in zip(dist,mind)]
+            for k in keepset: mind = update(mind,k)
+            used = set(keepset)
+            for n in range(quota):
+                for i in used: mind[i] = -1.0
+                k = 0 if n == 0 and not len(keepset) else max(range(tot),key=mind.__getitem__)
+                chosen.append(k)
+                used.add(k)
+                mind = update(mind,k)
+        chosen = set(chosen)
+        return [i for i in range(tot) if i not in keepset and i not in chosen]
+
     def calc_square_distance(self,system,bcon):
         """
         Return:
@@ -1871,6 +2402,128 @@ class Filtration:
             anglelist.append(ls)
         return anglelist
 
+    def calc_descriptors_parallel(self,system,bcon,acon,nproc=None,bosum=None):
+        """calculate bonds & angles on multiple processes
+
+        Rule:
+            molecules are split into slices, each process copies coordinates
+            of its own slice into shared memory, works on them, and writes
+            results into shared memory as well, on fork, nothing is pickled
+
+        Inputs:
+            bosum (bool): if True, only summed values of each molecule are returned
+
+        Return:
+            bondlist, anglelist : same as calc_square_distance & calc_angle_degree,
+                                  when bosum is True, they are 1D List[float]
+        """
+        if nproc is None: nproc = os.cpu_count()
+        bosum = True if bosum is True else False
+        nmol = len(system)
+        if not nmol: return [],[]
+        nats = len(system[0])
+        nb = 1 if bosum else len(bcon)
+        na = 1 if bosum else len(acon)
+
+        # coordinates in same layout are copied at once
+        bocopy = isinstance(system,CompactSystem) and system.typecode == 'd'
+        shms = []
+        try:
+            for n in [nmol*nats*3, nmol*nb, nmol*na]:
+                shms.append(shared_memory.SharedMemory(create=True,size=max(n,1)*8))
+            if bocopy:
+                mv = shms[0].buf.cast('d')
+                mv[:nmol*nats*3] = system.coords
+                mv.release()
+
+            dt = (nmol+nproc-1) // nproc
+            jobs = []
+            for beg in range(0,nmol,dt):
+                end = min(beg+dt,nmol)
+                mols = None if bocopy else system[beg:end]
+                args = ([i.name for i in shms],nats,bcon,acon,beg,end,bosum,mols)
+                p = multiprocessing.Process(target=calc_descriptors_worker,args=args)
+                p.start()
+                jobs.append(p)
+            for p in jobs: p.join()
+            if any([p.exitcode != 0 for p in jobs]):
+                raise RuntimeError('descriptors calculation fails on subprocess')
+
+            bondlist = []
+            anglelist = []
+            if len(bcon):
+                mv = shms[1].buf.cast('d')
+                if bosum:
+                    bondlist = mv[:nmol].tolist()
+                else:
+                    bondlist = [mv[i*nb:(i+1)*nb].tolist() for i in range(nmol)]
+                mv.release()
+            if len(acon):
+                mv = shms[2].buf.cast('d')
+                if bosum:
+                    anglelist = mv[:nmol].tolist()
+                else:
+                    anglelist = [mv[i*na:(i+1)*na].tolist() for i in range(nmol)]
+                mv.release()
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+        return bondlist,anglelist
+
+
+def calc_descriptors_worker(names,nats,bcon,acon,beg,end,bosum,mols=None):
+    """worker for Filtration.calc_descriptors_parallel, work on [beg,end)
+
+    mols: molecules on [beg,end), if not None, copy them to shared memory first
+    """
+    shms = [shared_memory.SharedMemory(name=i) for i in names]
+    xyz = shms[0].buf.cast('d')
+    if mols is not None:
+        off = beg * nats * 3
+        for mol in mols:
+            xyz[off:off+nats*3] = array.array('d',[v for at in mol for v in at[1:4]])
+            off += nats * 3
+    bout = shms[1].buf.cast('d')
+    aout = shms[2].buf.cast('d')
+    nb = 1 if bosum else len(bcon)
+    na = 1 if bosum else len(acon)
+    cvt = 180.0 / math.pi
+    for m in range(beg,end):
+        off = m * nats * 3
+        tot = 0.0
+        for n,ndx in enumerate(bcon):
+            i = off + ndx[0]*3
+            j = off + ndx[1]*3
+            dx = xyz[i] - xyz[j]
+            dy = xyz[i+1] - xyz[j+1]
+            dz = xyz[i+2] - xyz[j+2]
+            tmp = dx*dx + dy*dy + dz*dz
+            if bosum:
+                tot += tmp
+            else:
+                bout[m*nb+n] = tmp
+        if bosum and len(bcon): bout[m] = tot
+        tot = 0.0
+        for n,ndx in enumerate(acon):
+            a = off + ndx[0]*3
+            b = off + ndx[1]*3
+            c = off + ndx[2]*3
+            ba = [xyz[a]-xyz[b],xyz[a+1]-xyz[b+1],xyz[a+2]-xyz[b+2]]
+            bc = [xyz[c]-xyz[b],xyz[c+1]-xyz[b+1],xyz[c+2]-xyz[b+2]]
+            t = ba[0]*bc[0] + ba[1]*bc[1] + ba[2]*bc[2]
+            sub = sum([i*i for i in ba]) * sum([i*i for i in bc])
+            rst = math.acos(t/pow(sub,0.5)) * cvt
+            if bosum:
+                tot += rst
+            else:
+                aout[m*na+n] = rst
+        if bosum and len(acon): aout[m] = tot
+    xyz.release()
+    bout.release()
+    aout.release()
+    for shm in shms: shm.close()
+
 
 def test_class_Filtration_dynamic():
     """
@@ -2094,6 +2747,154 @@ def test_class_Filtration_static():
                 assert False
 
 
+def test_class_Filtration_connection(seed=None):
+    """
+    Be aware of the testing data file is used
+
+    seed: random seed, printed out for reproducing
+    """
+    if seed is None: seed = random.randrange(2**32)
+    print('==> connection filtration seed: ',seed)
+    random.seed(seed)
+
+    def checkrepeat(bi,bj,ai,aj,btol,atol):
+        for t,v in enumerate(bi):
+            if abs(pow(v,0.5)-pow(bj[t],0.5)) >= btol: return False
+        for t,v in enumerate(ai):
+            if abs(v-aj[t]) >= atol: return False
+        return True
+
+    rf = ReadFile('choosetest.txt')
+    if not rf.nice:
+        print(rf.info)
+        exit()
+    rf.run()
+    ltmp = list(range(len(rf.system[0])))
+    if len(ltmp) <= 4:
+        print('Fatal: atom too less, cannot debug')
+        exit()
+    bcon = []
+    for i in range(5):
+        s = random.sample(ltmp,k=2)
+        st = sorted(s)
+        if st not in bcon: bcon.append(st)
+    acon = []
+    for i in range(5):
+        s = random.sample(ltmp,k=3)
+        st = sorted(s)
+        if st not in acon: acon.append(st)
+
+    n = len(rf.system)
+    fd = {
+        'system'    :   rf.system,
+        'userinputs':   False,
+        'bcon'      :   bcon,
+        'acon'      :   acon,
+        'mode'      :   'connection',
+        'keepndxlist':  random.sample(range(n),random.randint(2,n//2)),
+    }
+    fn = Filtration(**fd)
+    fn.run()
+
+    rawbondlist = fn.calc_square_distance(rf.system,fn.bcon)
+    rawanglelist = fn.calc_angle_degree(rf.system,fn.acon)
+    goodlist = [i for i in range(n) if i not in fn.reflist]
+    keepset = set(fn.keepndxlist)
+    # no repeats in good molecules, keeps are always kept even they are repeats
+    for i,vi in enumerate(goodlist):
+        for vj in goodlist[i+1:]:
+            if vi in keepset and vj in keepset: continue
+            assert not checkrepeat(rawbondlist[vi],rawbondlist[vj],
+                                   rawanglelist[vi],rawanglelist[vj],fn.btol,fn.atol)
+    # every removed molecule has its repeat
+    for i in fn.reflist:
+        assert any([checkrepeat(rawbondlist[i],rawbondlist[j],rawanglelist[i],
+                    rawanglelist[j],fn.btol,fn.atol) for j in goodlist])
+    print('==> connection filtration ratio: ',fn.fratio)
+
+
+class OnlineFiltration:
+    """Online version of dynamic rule in Filtration
+
+    Inputs:
+        binc : float : increment on bonds, square of btol
+        ainc : float : increment on angles, atol
+        boall (bool): True for dynamic/all, False for dynamic/separate
+
+    Rule:
+        scores of kept molecules are stored in sorted list by bisect,
+
+        dynamic/all:
+            new molecule is kept only when its differences with both
+            adjacent scores are not smaller than tolerance
+
+        dynamic/separate:
+            new molecule is removed when any kept molecule whose bond score
+            is within binc, also has the angle score within ainc
+
+    Note:
+        molecules added with keep=True will always be kept
+    """
+    def __init__(self,binc,ainc,boall=None,*args,**kwargs):
+        self.binc = binc
+        self.ainc = ainc
+        self.boall = False if boall is False else True
+        self.keys = []
+        self.values = []
+
+    def add(self,bl,al,keep=None):
+        """
+        Inputs:
+            bl : List[float] : bondlist of the molecule
+            al : List[float] : anglelist of the molecule
+
+        Return:
+            True if molecule is kept, otherwise, False
+        """
+        bs = sum(bl)
+        at = sum(al)
+        if not len(bl) or not len(al) or self.boall:
+            if not len(bl):
+                key,inc = at,self.ainc
+            elif not len(al):
+                key,inc = bs,self.binc
+            else:
+                key,inc = bs+at,self.binc+self.ainc
+            ndx = bisect.bisect_left(self.keys,key)
+            if keep is not True:
+                if ndx > 0 and key - self.keys[ndx-1] < inc: return False
+                if ndx < len(self.keys) and self.keys[ndx] - key < inc: return False
+            self.keys.insert(ndx,key)
+            return True
+
+        if keep is not True:
+            lo = bisect.bisect_right(self.keys,bs-self.binc)
+            hi = bisect.bisect_left(self.keys,bs+self.binc)
+            for v in self.values[lo:hi]:
+                if abs(at-v) < self.ainc: return False
+        ndx = bisect.bisect_left(self.keys,bs)
+        self.keys.insert(ndx,bs)
+        self.values.insert(ndx,at)
+        return True
+
+
+def test_class_OnlineFiltration():
+    for boall in [True, False]:
+        of = OnlineFiltration(0.01,0.1,boall=boall)
+        good = []
+        for i in range(2000):
+            bl = [random.random() for j in range(3)]
+            al = [random.random()*10 for j in range(3)]
+            if of.add(bl,al): good.append([sum(bl),sum(al)])
+        for i,vi in enumerate(good):
+            for vj in good[i+1:]:
+                if boall:
+                    assert abs(vi[0]+vi[1]-vj[0]-vj[1]) >= 0.11
+                else:
+                    assert abs(vi[0]-vj[0]) >= 0.01 or abs(vi[1]-vj[1]) >= 0.1
+        print('==> online filtration kept: ',len(good))
+
+
 def file_gen_new(fname,fextend='txt',foriginal=True,bool_dot=True):
     """Generate new file name without overwritings
 
@@ -2127,7 +2928,37 @@ def file_gen_new(fname,fextend='txt',foriginal=True,bool_dot=True):
     return fname
 
 
-def plot_save_image(ini,fin=None,dt=None,fname=None,key=None):
+def downsample_envelope(xlist,ylist,npts=None):
+    """reduce number of points by min/max envelope, peaks are preserved
+
+    Rule:
+        points are split into npts/2 buckets in sequence, for each bucket,
+        only its minimum and maximum points are kept in original order
+
+    Inputs:
+        npts  :  int  :  target number of points, default 2000
+
+    Return:
+        xlist, ylist  :  original inputs if they are short enough
+    """
+    if npts is None: npts = 2000
+    tot = len(ylist)
+    if tot <= npts or npts < 4: return xlist,ylist
+    nb = npts // 2
+    xnew = []
+    ynew = []
+    for i in range(nb):
+        lo = i * tot // nb
+        hi = (i+1) * tot // nb
+        imin = min(range(lo,hi),key=ylist.__getitem__)
+        imax = max(range(lo,hi),key=ylist.__getitem__)
+        for j in sorted(set([imin,imax])):
+            xnew.append(xlist[j])
+            ynew.append(ylist[j])
+    return xnew,ynew
+
+
+def plot_save_image(ini,fin=None,dt=None,fname=None,key=None,npts=None):
     """
     Inputs:
         ini     :   2D  :   List [ List[int, ...],  float]
@@ -2135,6 +2966,7 @@ def plot_save_image(ini,fin=None,dt=None,fname=None,key=None):
         dt      :   float   :   increments, optional
         fname   :   str :   warning, overwritten may happen
         key     :   str :   {bonds, angles}, specify plot type
+        npts    :   int :   maximum number of points for each line, default 2000
 
     Return:
         True if file is successfully generated, otherwise, False
@@ -2170,6 +3002,9 @@ def plot_save_image(ini,fin=None,dt=None,fname=None,key=None):
         if bof:
             xfin = [fin[1]+dt*t for t in range(len(yfin))]
 
+    if boi: xini,yini = downsample_envelope(xini,yini,npts)
+    if bof: xfin,yfin = downsample_envelope(xfin,yfin,npts)
+
     if key is None:
         title = 'Filtration'
     else:
@@ -2206,9 +3041,88 @@ def plot_save_image(ini,fin=None,dt=None,fname=None,key=None):
     return True
 
 
+PROBDATA_MAGIC = b'#CFPD01\n'
+
+
+def save_probdata_binary(fname,header,entries):
+    """save probability data to binary file
+
+    Inputs:
+        header  :  dict  :  json serializable, e.g. files, btol, atol, bcon, acon
+        entries :  List[ [dict, List[int]] ]  :  json serializable info and its
+                   counts, e.g. {'key':'begin', 'mark':'bpar', 'con':[1,2], 'rmin':0.9}
+
+    File Format:
+        magic       :  8 bytes  :  #CFPD01\n
+        header size :  8 bytes  :  unsigned int64, little-endian
+        header      :  json, padded by spaces to 8 bytes aligned, each entry
+                       has offset (in bytes) & count & typecode on data block
+        data        :  little-endian, each entry is 8 bytes aligned, typecode
+                       is the smallest one in [B, H, I, Q] to hold the counts
+    """
+    header = {k:v for k,v in header.items()}
+    header['entries'] = []
+    datalist = []
+    offset = 0
+    for info,counts in entries:
+        vmax = max(counts) if len(counts) else 0
+        for tc in ['B','H','I','Q']:
+            data = array.array(tc)
+            if vmax < 2**(8*data.itemsize): break
+        data.extend(counts)
+        if sys.byteorder != 'little': data.byteswap()
+        data = data.tobytes()
+        data += b'\0' * (-len(data) % 8)
+        info = {k:v for k,v in info.items()}
+        info['offset'] = offset
+        info['count'] = len(counts)
+        info['typecode'] = tc
+        offset += len(data)
+        datalist.append(data)
+        header['entries'].append(info)
+    txt = json.dumps(header).encode('utf-8')
+    txt += b' ' * (-len(txt) % 8)
+    with open(fname,'wb') as f:
+        f.write(PROBDATA_MAGIC)
+        f.write(struct.pack('<Q',len(txt)))
+        f.write(txt)
+        for data in datalist: f.write(data)
+
+
+def read_probdata_binary(file):
+    """zero-copy reader for file saved by save_probdata_binary
+
+    Return:
+        header  :  dict  :  None if file is not valid, for each entry, key 'data'
+                            is the memoryview of counts on file mapping
+    """
+    with open(file,'rb') as f:
+        if f.read(8) != PROBDATA_MAGIC: return None
+        try:
+            n = struct.unpack('<Q',f.read(8))[0]
+            header = json.loads(f.read(n).decode('utf-8'))
+        except (struct.error,ValueError):
+            return None
+        mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    beg = 16 + n
+    view = memoryview(mm)
+    for info in header['entries']:
+        tc = info['typecode']
+        lo = beg + info['offset']
+        hi = lo + info['count']*array.array(tc).itemsize
+        if sys.byteorder == 'little':
+            info['data'] = view[lo:hi].cast(tc)
+        else:
+            info['data'] = array.array(tc,view[lo:hi].tobytes())
+            info['data'].byteswap()
+    return header
+
+
 def getrealsizeof(o):
     """recursively get the real size of built-in objects, unit in bytes
     """
+    if isinstance(o,CompactSystem):
+        return o.getsizeof()
     tot = sys.getsizeof(o)
     if isinstance(o,(int,str,float)):
         return tot
@@ -2263,6 +3177,16 @@ class BulkProcess:
                     print('Warning: not an index file < {:} >, ignoring'.format(f))
 
         self.bool_force_double_check = False if bool_force_double_check is False else True
+        self.compact = True if 'compact' in kwargs and kwargs['compact'] is True else False
+        self.typecode = kwargs['typecode'] if 'typecode' in kwargs else None
+        self.checkpoint = None
+        self.filekeys = {}
+        ckpath = kwargs['checkpoint'] if 'checkpoint' in kwargs else None
+        boresume = True if 'boresume' in kwargs and kwargs['boresume'] is True else False
+        if ckpath or boresume:
+            self.checkpoint = Checkpoint(ckpath,boresume)
+            if boresume:
+                print('Note: resuming from checkpoint < {:} >'.format(self.checkpoint.path))
         self.args = args
         self.kwargs = kwargs
 
@@ -2293,7 +3217,8 @@ class BulkProcess:
                 ftmp = tempfile.NamedTemporaryFile()
                 ftmp.write(''.join(profile).encode('utf-8'))
                 ftmp.flush()
-                rf = ReadFile(ftmp.name,ext=file[file.rfind('.')+1:],debug=False)
+                rf = ReadFile(ftmp.name,ext=file[file.rfind('.')+1:],debug=False,
+                              compact=self.compact,typecode=self.typecode)
                 if len(profile) < 3000: rf.nice = False
                 if rf.nice:
                     rf.run()
@@ -2329,85 +3254,155 @@ class BulkProcess:
         self.get_connections(choose[0][0])
         if not self.nice: return
 
-        # to make cross filtration happen, sysndxlist should be at the first
-        allsystem = []
-        allenergy = []
-        for i in sysndxlist:
-            allenergy.extend([None for j in range(len(i))])
-            allsystem.extend(i)
-        allkeeps = list(range(len(allsystem)))
-        for i in systemlist: allsystem.extend(i)
-        for i in energylist: allenergy.extend(i)
+        allsystem,allenergy,allkeeps = self.merge_datalist(systemlist,energylist,sysndxlist)
+        if not self.nice: return
         mf = Filtration(system=allsystem,keepndxlist=allkeeps,*self.args,**self.kwargs)
 
         # prompt for double check
         if self.bool_force_double_check:
-            print('\nCheck: current work path:')
-            print('   => {:}'.format(os.path.abspath('.')))
-            print('\nCheck: data files:')
-            for cnt,fd in enumerate(self.datafilelist):
-                print('   => {:} -- molnms {:}'.format(fd,self.molnms[cnt]))
-
-            if len(self.indexfilelist):
-                print('Check: index files:')
-                for cnt,fd in enumerate(self.indexfilelist):
-                    print('   => {:} -- molnms {:}'.format(fd,len(sysndxlist[cnt])))
-
-            print('Check: molecule fragments:')
-            lt = []
-            for i in self.kwargs['fragments']: lt.append([j+1 for j in i])
-            print('   => {:}'.format(lt))
-
-            print('Check: bond connection:')
-            lt = []
-            for i in self.kwargs['bcon']: lt.append([j+1 for j in i])
-            print('   => {:}'.format(lt))
-
-            print('Check: angle connection:')
-            lt = []
-            for i in self.kwargs['acon']: lt.append([j+1 for j in i])
-            print('   => {:}'.format(lt))
-
-            print('Check: total inputs < {:} >'.format(sum(self.molnms)))
-
-            stmp = 'ON' if mf.oball else 'OFF'
-            print('Check: (image) bonds all probability < {:} >'.format(stmp))
-            stmp = 'ON' if mf.obpar else 'OFF'
-            print('Check: (images) bonds par probability < {:} > (time consuming)'.format(stmp))
-            stmp = 'ON' if mf.oaall else 'OFF'
-            print('Check: (image) angles all probability < {:} >'.format(stmp))
-            stmp = 'ON' if mf.oapar else 'OFF'
-            print('Check: (images) angles par probability < {:} > (time consuming)'.format(stmp))
-            print('Check: bonds tolerance < {:} Angstrom >'.format(mf.btol))
-            print('Check: angles tolerance < {:} degree >'.format(mf.atol))
-            if mf.mode == 'dynamic':
-                if mf.boall:
-                    print('Check: calculation type: < dynamic/all >')
-                else:
-                    print('Check: calculation type: < dynamic/separate >')
-            else:
-                if mf.borandom:
-                    print('Check: calculation type: < static/random >')
-                else:
-                    print('Check: calculation type: < static/lowest-bit >')
-                if mf.vndx: print('Check: calculation vndx: < {:} >'.format(mf.vndx))
-            imtot = 0
-            if mf.oball: imtot += 1
-            if mf.oaall: imtot += 1
-            if mf.obpar: imtot += len(mf.bcon)
-            if mf.oapar: imtot += len(mf.acon)
-            print('Check: number of images will be generated: < {:} >'.format(imtot))
-
-            print('\nDo you want to continue? y/yes, else not. Input: ',end='')
-            if input().lower() not in ['y','yes']:
-                print('Note: you decided to quit, nothing will be processed')
-                return
-            print()
+            if not self.check_inputs(mf,sysndxlist): return
 
         if debug: return allsystem
+        if self.checkpoint is not None: rkey = self.calc_checkpoint(mf)
         mf.run()
+        if self.checkpoint is not None: self.checkpoint.save('reflist',rkey,[mf.reflist,mf.seed])
+        self.collect_results(mf,allsystem,allenergy,allkeeps,systemlist,sysndxlist)
+        self.save_files()
+
+    def calc_checkpoint(self,mf):
+        """load or calculate descriptors & reference list on checkpoint
+
+        Return:
+            key of reference list, which should be saved after mf.run
+        """
+        ck = self.checkpoint
+        fkeys = [self.filekeys[f] for f in [*self.indexfilelist,*self.datafilelist]]
+        dkey = ck.get_key(fkeys,mf.bcon,mf.acon)
+        data = ck.load('descriptors',dkey)
+        if data is not None:
+            print('Note: connections are loaded from checkpoint')
+        else:
+            if mf.prebondlist is not None or mf.preanglelist is not None:
+                bondlist = [] if mf.prebondlist is None else mf.prebondlist
+                anglelist = [] if mf.preanglelist is None else mf.preanglelist
+            else:
+                print('Note: calculating connections ...')
+                bondlist,anglelist = self.calc_descriptors(mf,mf.system)
+            data = [bondlist,anglelist]
+            ck.save('descriptors',dkey,data)
+        mf.prebondlist,mf.preanglelist = data
+
+        seed = self.kwargs['seed'] if 'seed' in self.kwargs else None
+        rkey = ck.get_key(dkey,mf.mode,mf.btol,mf.atol,mf.vndx,mf.borandom,mf.boall,mf.quota,seed)
+        data = ck.load('reflist',rkey)
+        if data is not None:
+            print('Note: repeats reference is loaded from checkpoint')
+            mf.prereflist,mf.seed = data
+        return rkey
+
+    def calc_descriptors(self,mf,system):
+        """calculate bondlist & anglelist on system by settings in Filtration mf"""
+        if mf.nproc > 1 and len(system) >= mf.nproc:
+            return mf.calc_descriptors_parallel(system,mf.bcon,mf.acon,mf.nproc)
+        return mf.calc_square_distance(system,mf.bcon), mf.calc_angle_degree(system,mf.acon)
+
+    def merge_datalist(self,systemlist,energylist,sysndxlist):
+        """merge data from files into one system
+
+        Return:
+            allsystem, allenergy, allkeeps  :  allkeeps are indexes of sysndxlist
+        """
+        # to make cross filtration happen, sysndxlist should be at the first
+        allsystem = CompactSystem(typecode=self.typecode) if self.compact else []
+        allenergy = []
+        try:
+            for i in sysndxlist:
+                allenergy.extend([None for j in range(len(i))])
+                allsystem.extend(i)
+            allkeeps = list(range(len(allsystem)))
+            for i in systemlist: allsystem.extend(i)
+        except ValueError:
+            self.nice = False
+            self.info = 'Fatal: atomtypes are not cooresponded in input files'
+            return None,None,None
+        for i in energylist: allenergy.extend(i)
+        return allsystem,allenergy,allkeeps
+
+    def check_inputs(self,mf,sysndxlist):
+        """prompt for double check, return True when user decides to continue"""
+        print('\nCheck: current work path:')
+        print('   => {:}'.format(os.path.abspath('.')))
+        print('\nCheck: data files:')
+        for cnt,fd in enumerate(self.datafilelist):
+            print('   => {:} -- molnms {:}'.format(fd,self.molnms[cnt]))
+
+        if len(self.indexfilelist):
+            print('Check: index files:')
+            for cnt,fd in enumerate(self.indexfilelist):
+                print('   => {:} -- molnms {:}'.format(fd,len(sysndxlist[cnt])))
+
+        print('Check: molecule fragments:')
+        lt = []
+        for i in self.kwargs['fragments']: lt.append([j+1 for j in i])
+        print('   => {:}'.format(lt))
+
+        print('Check: bond connection:')
+        lt = []
+        for i in self.kwargs['bcon']: lt.append([j+1 for j in i])
+        print('   => {:}'.format(lt))
+
+        print('Check: angle connection:')
+        lt = []
+        for i in self.kwargs['acon']: lt.append([j+1 for j in i])
+        print('   => {:}'.format(lt))
+
+        print('Check: total inputs < {:} >'.format(sum(self.molnms)))
+
+        stmp = 'ON' if mf.oball else 'OFF'
+        print('Check: (image) bonds all probability < {:} >'.format(stmp))
+        stmp = 'ON' if mf.obpar else 'OFF'
+        print('Check: (images) bonds par probability < {:} > (time consuming)'.format(stmp))
+        stmp = 'ON' if mf.oaall else 'OFF'
+        print('Check: (image) angles all probability < {:} >'.format(stmp))
+        stmp = 'ON' if mf.oapar else 'OFF'
+        print('Check: (images) angles par probability < {:} > (time consuming)'.format(stmp))
+        print('Check: bonds tolerance < {:} Angstrom >'.format(mf.btol))
+        print('Check: angles tolerance < {:} degree >'.format(mf.atol))
+        print('Check: number of processes < {:} >'.format(mf.nproc))
+        if mf.mode == 'dynamic':
+            if mf.boall:
+                print('Check: calculation type: < dynamic/all >')
+            else:
+                print('Check: calculation type: < dynamic/separate >')
+        elif mf.mode == 'connection':
+            print('Check: calculation type: < connection >')
+        elif mf.mode == 'quota':
+            print('Check: calculation type: < quota/{:} >'.format(mf.quota))
+        else:
+            if mf.borandom:
+                print('Check: calculation type: < static/random >')
+            else:
+                print('Check: calculation type: < static/lowest-bit >')
+            if mf.vndx: print('Check: calculation vndx: < {:} >'.format(mf.vndx))
+        imtot = 0
+        if mf.oball: imtot += 1
+        if mf.oaall: imtot += 1
+        if mf.obpar: imtot += len(mf.bcon)
+        if mf.oapar: imtot += len(mf.acon)
+        print('Check: number of images will be generated: < {:} >'.format(imtot))
+
+        print('\nDo you want to continue? y/yes, else not. Input: ',end='')
+        if input().lower() not in ['y','yes']:
+            print('Note: you decided to quit, nothing will be processed')
+            return False
+        print()
+        return True
+
+    def collect_results(self,mf,allsystem,allenergy,allkeeps,systemlist,sysndxlist):
+        """collect results after Filtration.run"""
         self.seed = mf.seed
         self.mode = mf.mode
+        self.quota = mf.quota
         self.boall = mf.boall
         self.vndx = mf.vndx
         self.borandom = mf.borandom
@@ -2442,7 +3437,7 @@ class BulkProcess:
                 self.rmnmlist[ndx-1] = cnt
 
         self.overall_energy = []
-        self.overall_system = []
+        goodlist = []
         totreflist = sorted([*allkeeps,*mf.reflist])
         totreflist.append(-1)
         ndx = 0
@@ -2451,7 +3446,11 @@ class BulkProcess:
                 ndx += 1
             else:
                 self.overall_energy.append(v)
-                self.overall_system.append(allsystem[i])
+                goodlist.append(i)
+        if self.compact:
+            self.overall_system = allsystem.take(goodlist)
+        else:
+            self.overall_system = [allsystem[i] for i in goodlist]
         self.bcon = mf.bcon
         self.acon = mf.acon
         self.btol = mf.btol
@@ -2459,9 +3458,13 @@ class BulkProcess:
         self.boim = True if mf.oball or mf.obpar or mf.oaall or mf.oapar else False
         self.overall_prob_begin = mf.prob_begin
         self.overall_prob_final = mf.prob_final
-        self.save_files()
 
-    def save_files(self):
+    def save_files(self,bothread=None):
+        """
+        Inputs:
+            bothread (bool): if True, result file is written on a separate thread,
+                             meanwhile, probability data & images are generated
+        """
         print('\nNote: saving bulk process results ...')
         tot = len(self.overall_system)
         print('Note: total molnms: < {:} >'.format(sum(self.molnms)))
@@ -2474,15 +3477,25 @@ class BulkProcess:
         self.kwargs['fname'] = file_gen_new(fd.fname,fextend=fd.ftype)
         self.kwargs['energy'] = self.overall_energy
         fd = SaveFile(self.overall_system,*self.args,**self.kwargs)
-        fd.run()
         outfile = fd.fname
-        print('Note: file is saved to < {:} >'.format(outfile))
+        writer = None
+        if bothread is True:
+            writer = threading.Thread(target=fd.run)
+            writer.start()
+        else:
+            fd.run()
+            print('Note: file is saved to < {:} >'.format(outfile))
 
         filedict = {}
 
         # images
         if self.boim:
-            filedict['probability data file'] = self.save_probdata()
+            probformat = self.kwargs['probformat'] if 'probformat' in self.kwargs else None
+            if probformat is None: probformat = 'all'
+            if probformat in ['txt','all']:
+                filedict['probability data file'] = self.save_probdata()
+            if probformat in ['bin','all']:
+                filedict['probability binary data file'] = self.save_probdata_bin()
 
             if len(self.overall_prob_begin['ball']):
                 fgp = file_gen_new('bonds-all',fextend='png',foriginal=False)
@@ -2532,6 +3545,10 @@ class BulkProcess:
                 )
                 if fbo: filedict['image angles par filtration file'].append(fgp)
 
+        if writer is not None:
+            writer.join()
+            print('Note: file is saved to < {:} >'.format(outfile))
+
         ftot = file_gen_new('bulk-process-info')
         print('Note: please check summary file for more info: < {:} >'.format(ftot))
         with open(ftot,'wt') as f:
@@ -2557,6 +3574,12 @@ class BulkProcess:
                     f.write('  => calculation is performed for all entries\n')
                 else:
                     f.write('  => calculation is performed separately\n')
+            elif self.mode == 'connection':
+                f.write('\nNote: filtration mode is: connection\n')
+                f.write('  => repeats only when all connections are within tolerance\n')
+            elif self.mode == 'quota':
+                f.write('\nNote: filtration mode is: quota\n')
+                f.write('  => farthest point sampling on number: {:}\n'.format(self.quota))
             else:
                 f.write('\nNote: filtration mode is: static\n')
                 if self.vndx: f.write('  => index value is: {:}\n'.format(self.vndx))
@@ -2644,12 +3667,47 @@ class BulkProcess:
             f.write(gen_outputs(self.overall_prob_final,mbcon,macon,'final'))
         return fdata
 
+    def save_probdata_bin(self):
+        mbcon = [[i+1 for i in j] for j in self.bcon]
+        macon = [[i+1 for i in j] for j in self.acon]
+        header = {
+            'files' :   self.datafilelist,
+            'btol'  :   self.btol,
+            'atol'  :   self.atol,
+            'bcon'  :   mbcon,
+            'acon'  :   macon,
+        }
+        entries = []
+        for key,prob in [['begin',self.overall_prob_begin],['final',self.overall_prob_final]]:
+            if len(prob['ball']):
+                entries.append([{'key':key,'mark':'ball','con':[],'rmin':prob['ball'][1]},prob['ball'][0]])
+            for n,data in enumerate(prob['bpar']):
+                entries.append([{'key':key,'mark':'bpar','con':mbcon[n],'rmin':data[1]},data[0]])
+            if len(prob['aall']):
+                entries.append([{'key':key,'mark':'aall','con':[],'rmin':prob['aall'][1]},prob['aall'][0]])
+            for n,data in enumerate(prob['apar']):
+                entries.append([{'key':key,'mark':'apar','con':macon[n],'rmin':data[1]},data[0]])
+        fdata = file_gen_new('bulk-probability-data',fextend='bin')
+        print('Note: probability binary data is saved to < {:} >'.format(fdata))
+        save_probdata_binary(fdata,header,entries)
+        return fdata
+
     def get_datalist(self,filelist):
         """return 4D list"""
         datalist = []
         energylist = []
         for f in filelist:
-            rf = ReadFile(f)
+            if self.checkpoint is not None:
+                key = self.checkpoint.get_filekey(f,self.compact,self.typecode)
+                self.filekeys[f] = key
+                name = 'file-' + hashlib.sha1(os.path.abspath(f).encode('utf-8')).hexdigest()
+                data = self.checkpoint.load(name,key)
+                if data is not None:
+                    print('Note: for file < {:} >, number of inputs < {:} > (checkpoint)'.format(f,len(data[0])))
+                    datalist.append(data[0])
+                    energylist.append(data[1])
+                    continue
+            rf = ReadFile(f,compact=self.compact,typecode=self.typecode)
             if rf.nice:
                 rf.run()
                 print('Note: for file < {:} >, number of inputs < {:} >'.format(f,len(rf.system)))
@@ -2657,6 +3715,8 @@ class BulkProcess:
                 print(rf.info)
             datalist.append(rf.system)
             energylist.append(rf.energy)
+            if self.checkpoint is not None and rf.nice:
+                self.checkpoint.save(name,key,[rf.system,rf.energy])
         return datalist,energylist
 
     def get_connections(self,system):
@@ -2675,7 +3735,16 @@ class BulkProcess:
             self.nice = False
             self.info = fn.info
             return
-        fn.run()
+        if 'bocache' in self.kwargs and self.kwargs['bocache'] is False:
+            fn.run()
+        else:
+            cachedir = self.kwargs['cachedir'] if 'cachedir' in self.kwargs else None
+            pc = PerceptionCache(cachedir)
+            if pc.load(fn):
+                print('Note: perception results are loaded from cache')
+            else:
+                fn.run()
+                pc.save(fn)
 
         if 'userinputs' in self.kwargs and self.kwargs['userinputs'] is True:
             self.kwargs['userinputs'] = True
@@ -2836,6 +3905,392 @@ class BulkProcess:
         return bcon,acon
 
 
+class FollowProcess(BulkProcess):
+    """follow growing data files, filter new molecules on the fly
+
+    Inputs:
+        interval (float): seconds between two checks, default 5
+        timeout  (float): stop when no new molecules coming in these seconds,
+                          default 600, use Ctrl-C to stop at any time
+
+    Note:
+        only dynamic rule is used, see OnlineFiltration,
+        molecules in index files are always kept as reference,
+        accepted molecules are appended to result file immediately
+    """
+    def __init__(self,interval=None,timeout=None,*args,**kwargs):
+        super().__init__(*args,**kwargs)
+        self.interval = 5.0 if interval is None else interval
+        self.timeout = 600.0 if timeout is None else timeout
+
+    def run(self):
+        self.sysndxlist = []
+        if len(self.indexfilelist):
+            self.sysndxlist,tmp = self.get_datalist(self.indexfilelist)
+
+        self.offsets = [0 for i in self.datafilelist]
+        self.molnms = [0 for i in self.datafilelist]
+        self.keepnms = [0 for i in self.datafilelist]
+        self.outfile = None
+        self.mf = None
+        mytime = time.time()
+        print('Note: following data files, press Ctrl-C to stop ...')
+        try:
+            while True:
+                bonew = False
+                for cnt in range(len(self.datafilelist)):
+                    if self.follow(cnt): bonew = True
+                    if not self.nice: return
+                if bonew:
+                    mytime = time.time()
+                elif time.time() - mytime > self.timeout:
+                    print('Note: no new inputs in {:} seconds, stopping'.format(self.timeout))
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print('\nNote: following is stopped by user')
+
+        # last molecule of each file is not followed by any separator
+        for cnt in range(len(self.datafilelist)):
+            self.follow(cnt,boend=True)
+            if not self.nice: return
+
+        print('\nNote: total molnms: < {:} >'.format(sum(self.molnms)))
+        print('Note: final molnms: < {:} >'.format(sum(self.keepnms)))
+        if self.outfile is not None:
+            print('Note: file is saved to < {:} >'.format(self.outfile))
+
+    def follow(self,cnt,boend=False):
+        """filter new molecules of data file on index cnt
+
+        Return:
+            bool  :  whether new molecules are read
+        """
+        file = self.datafilelist[cnt]
+        system,energy = self.get_newdata(cnt,boend=boend)
+        if not len(system): return False
+        if self.mf is None:
+            # connections only need to be calculated once
+            self.get_connections(system[0])
+            if not self.nice: return False
+            self.mf = Filtration(*self.args,**self.kwargs)
+            if self.mf.mode != 'dynamic':
+                print('Warning: follow mode only works on dynamic rule')
+            self.atypes = [at[0] for at in system[0]]
+            self.mo = OnlineFiltration(self.mf.btol*self.mf.btol,self.mf.atol,self.mf.boall)
+            for mol in [j for i in self.sysndxlist for j in i]:
+                if [at[0] for at in mol] != self.atypes: continue
+                bl = self.mf.calc_square_distance([mol],self.mf.bcon)
+                al = self.mf.calc_angle_degree([mol],self.mf.acon)
+                self.mo.add(bl[0] if len(bl) else [],al[0] if len(al) else [],keep=True)
+        goodsys = []
+        goodene = []
+        for ndx,mol in enumerate(system):
+            if [at[0] for at in mol] != self.atypes:
+                print('Warning: ignoring: error: not cooresponded')
+                continue
+            self.molnms[cnt] += 1
+            bl = self.mf.calc_square_distance([mol],self.mf.bcon)
+            al = self.mf.calc_angle_degree([mol],self.mf.acon)
+            if self.mo.add(bl[0] if len(bl) else [],al[0] if len(al) else []):
+                goodsys.append(mol)
+                goodene.append(energy[ndx])
+        self.keepnms[cnt] += len(goodsys)
+        if len(goodsys): self.save_newdata(goodsys,goodene)
+        print('Note: file < {:} >: new inputs < {:} >, kept < {:} >'.format(
+            file,len(system),len(goodsys)))
+        return True
+
+    def get_newdata(self,cnt,boend=False):
+        """read complete molecules appended after last reading
+
+        Args:
+            boend (bool): if True, end of file is treated as separator when
+                          the last line is complete, used after following
+
+        Return:
+            system, energy  :  same as ReadFile
+        """
+        file = self.datafilelist[cnt]
+        if not os.path.isfile(file): return [],[]
+        size = os.stat(file).st_size
+        if size < self.offsets[cnt]:
+            print('Warning: file is truncated, reading from beginning < {:} >'.format(file))
+            self.offsets[cnt] = 0
+        if size == self.offsets[cnt]: return [],[]
+        with open(file,'rb') as f:
+            f.seek(self.offsets[cnt])
+            data = f.read()
+
+        rf = ReadFile(file,debug=False)
+        if not rf.nice: return [],[]
+        # only the molecules followed by a separator are complete
+        end = 0
+        pos = 0
+        for line in data.splitlines(keepends=True):
+            pos += len(line)
+            if not line.endswith(b'\n'): break
+            sub = line.strip()
+            if rf.ext == 'xsf':
+                if sub.startswith(b'#'): end = pos - len(line)
+            elif not len(sub):
+                end = pos
+        if boend and data.endswith(b'\n'): end = len(data)
+        if end == 0: return [],[]
+        self.offsets[cnt] += end
+        rf.run(profile=data[:end].decode('utf-8').splitlines(keepends=True))
+        return rf.system,rf.energy
+
+    def save_newdata(self,system,energy):
+        if self.outfile is None:
+            fd = SaveFile(system,*self.args,**self.kwargs)
+            if not fd.nice:
+                print(fd.info)
+                return
+            self.kwargs['fname'] = file_gen_new(fd.fname,fextend=fd.ftype)
+            self.outfile = self.kwargs['fname']
+        fd = SaveFile(system,energy=energy,*self.args,**self.kwargs)
+        fd.run(append=True)
+
+
+
+class SaturationProcess(BulkProcess):
+    """incremental analysis on data files, report new unique rate of each file
+
+    Inputs:
+        threshold (float): yield rate below it is treated as saturated, default 0.05
+        patience  (int)  : number of continuous saturated files to suggest stopping, default 1
+        bostop    (bool) : if True, remaining files are not processed after saturation
+
+    Rule:
+        data files are processed in input order, index files are references,
+        each molecule is checked by OnlineFiltration with all kept molecules
+        before it, yield rate = number of new molecules / inputs of the file
+
+    Note:
+        only dynamic rule is used, see OnlineFiltration
+    """
+    def __init__(self,threshold=None,patience=None,bostop=None,*args,**kwargs):
+        super().__init__(*args,**kwargs)
+        self.threshold = 0.05 if threshold is None else threshold
+        self.patience = patience if patience and patience > 0 else 1
+        self.bostop = True if bostop is True else False
+
+    def run(self):
+        sysndxlist = []
+        if len(self.indexfilelist):
+            sysndxlist,tmp = self.get_datalist(self.indexfilelist)
+
+        self.files = []
+        self.molnms = []
+        self.keepnms = []
+        self.rates = []
+        self.satfile = None
+        self.satndx = None
+        mf = None
+        nsat = 0
+        for cnt,file in enumerate(self.datafilelist):
+            systemlist,tmp = self.get_datalist([file])
+            system = systemlist[0]
+            if not len(system):
+                # empty or unreadable file, no information on saturation
+                print('Warning: file < {:} >: no inputs, skipping'.format(file))
+                continue
+            if mf is None:
+                # connections only need to be calculated once
+                self.get_connections(system[0])
+                if not self.nice: return
+                mf = Filtration(*self.args,**self.kwargs)
+                if mf.mode != 'dynamic':
+                    print('Warning: saturation analysis only works on dynamic rule')
+                self.atypes = [at[0] for at in system[0]]
+                mo = OnlineFiltration(mf.btol*mf.btol,mf.atol,mf.boall)
+                for tmpsys in sysndxlist:
+                    tmpsys = [mol for mol in tmpsys if [at[0] for at in mol] == self.atypes]
+                    bl,al = self.calc_descriptors(mf,tmpsys)
+                    for n in range(len(tmpsys)):
+                        mo.add(bl[n] if len(bl) else [],al[n] if len(al) else [],keep=True)
+            keep = 0
+            good = [mol for mol in system if [at[0] for at in mol] == self.atypes]
+            if len(good) != len(system):
+                print('Warning: ignoring: error: not cooresponded: < {:} >'.format(len(system)-len(good)))
+            if not len(good):
+                print('Warning: file < {:} >: no valid inputs, skipping'.format(file))
+                continue
+            bl,al = self.calc_descriptors(mf,good)
+            for n in range(len(good)):
+                if mo.add(bl[n] if len(bl) else [],al[n] if len(al) else []): keep += 1
+            rate = keep / len(system)
+            self.files.append(file)
+            self.molnms.append(len(system))
+            self.keepnms.append(keep)
+            self.rates.append(rate)
+            print('Note: file < {:} >: new < {:} >, yield rate < {:.4f} >'.format(file,keep,rate))
+
+            nsat = nsat + 1 if rate < self.threshold else 0
+            if nsat >= self.patience and self.satfile is None:
+                self.satfile = file
+                self.satndx = cnt
+                print('Note: sampling is saturated at file < {:} >'.format(file))
+                print('  => further sampling runs are suggested to stop')
+                if self.bostop:
+                    print('Note: stopping, remaining files will not be processed')
+                    break
+        if mf is None:
+            self.nice = False
+            self.info = 'Fatal: no inputs after process'
+            return
+        self.btol = mf.btol
+        self.atol = mf.atol
+        self.save_report()
+
+    def save_report(self):
+        ftot = file_gen_new('saturation-report')
+        print('\nNote: total molnms: < {:} >'.format(sum(self.molnms)))
+        print('Note: unique molnms: < {:} >'.format(sum(self.keepnms)))
+        print('Note: please check saturation report for more info: < {:} >'.format(ftot))
+        with open(ftot,'wt') as f:
+            f.write('Note: time: {:}\n'.format(time.ctime()))
+            f.write('Note: current work path:\n')
+            f.write('  => {:}\n'.format(os.path.abspath('.')))
+            if len(self.indexfilelist):
+                f.write('Note: index files:\n')
+                for fd in self.indexfilelist:
+                    f.write('  => {:}\n'.format(fd))
+            f.write('Note: btol   : {:} Angstrom\n'.format(self.btol))
+            f.write('Note: atol   : {:} degree\n'.format(self.atol))
+            f.write('Note: yield rate threshold: {:}\n'.format(self.threshold))
+            f.write('Note: patience: {:}\n\n'.format(self.patience))
+            f.write('# {:>4} {:>10} {:>10} {:>10} {:>10}   {:}\n'.format(
+                'ndx','molnms','new','rate','unique','file'))
+            tot = 0
+            for i,nm in enumerate(self.molnms):
+                tot += self.keepnms[i]
+                f.write('  {:>4} {:>10} {:>10} {:>10.4f} {:>10}   {:}\n'.format(
+                    i+1,nm,self.keepnms[i],self.rates[i],tot,self.files[i]))
+            if self.satfile is None:
+                f.write('\nNote: sampling is not saturated, more runs are helpful\n')
+            else:
+                f.write('\nNote: sampling is saturated at file: {:}\n'.format(self.satfile))
+                f.write('  => further sampling runs are suggested to stop\n')
+                if self.bostop and self.satndx+1 < len(self.datafilelist):
+                    f.write('Note: files not processed:\n')
+                    for fd in self.datafilelist[self.satndx+1:]:
+                        f.write('  => {:}\n'.format(fd))
+
+
+
+class PipelineProcess(BulkProcess):
+    """pipelined bulk process, reading, calculating and saving are overlapped
+
+    Inputs:
+        qsize (int): maximum number of parsed files waiting in queue, default 2
+
+    Rule:
+        a reader thread parses files one by one into a bounded queue,
+        meanwhile, descriptors of parsed files are calculated on main thread,
+        (on subprocesses when nproc > 1), after filtration, result file is
+        written on a writer thread while probability data & images are generated
+
+    Note:
+        results are the same as BulkProcess,
+        double check is prompted after all files are read
+    """
+    def __init__(self,qsize=None,*args,**kwargs):
+        super().__init__(*args,**kwargs)
+        self.qsize = qsize if qsize and qsize > 0 else 2
+
+    def run(self,debug=None):
+        # data files are read first, connections are got on the first molecule
+        filelist = [*self.datafilelist,*self.indexfilelist]
+        nd = len(self.datafilelist)
+        q = queue.Queue(maxsize=self.qsize)
+        stop = threading.Event()
+        reader = threading.Thread(target=self.read_worker,args=(filelist,q,stop),daemon=True)
+        reader.start()
+
+        systemlist = [[] for i in range(nd)]
+        energylist = [[] for i in range(nd)]
+        sysndxlist = [[] for i in self.indexfilelist]
+        bdict = {}
+        adict = {}
+        pending = []
+        mf = None
+        try:
+            while True:
+                item = q.get()
+                if item is None: break
+                if isinstance(item,Exception): raise item
+                cnt,system,energy = item
+                if cnt < nd:
+                    systemlist[cnt] = system
+                    energylist[cnt] = energy
+                else:
+                    sysndxlist[cnt-nd] = system
+                pending.append(cnt)
+                if mf is None:
+                    if cnt >= nd or not len(system): continue
+                    self.get_connections(system[0])
+                    if not self.nice: return
+                    mf = Filtration(*self.args,**self.kwargs)
+                for n in pending:
+                    tmpsys = systemlist[n] if n < nd else sysndxlist[n-nd]
+                    bdict[n],adict[n] = self.calc_descriptors(mf,tmpsys)
+                    print('Note: connections are calculated for file < {:} >'.format(filelist[n]))
+                pending = []
+        finally:
+            stop.set()
+        reader.join()
+
+        if mf is None:
+            self.nice = False
+            self.info = 'Fatal: no inputs after process'
+            return
+        self.molnms = [len(i) for i in systemlist]
+
+        allsystem,allenergy,allkeeps = self.merge_datalist(systemlist,energylist,sysndxlist)
+        if not self.nice: return
+        order = [*range(nd,len(filelist)),*range(nd)]
+        bondlist = [v for n in order for v in bdict[n]]
+        anglelist = [v for n in order for v in adict[n]]
+        mf = Filtration(system=allsystem,keepndxlist=allkeeps,prebondlist=bondlist,
+                        preanglelist=anglelist,*self.args,**self.kwargs)
+
+        # prompt for double check
+        if self.bool_force_double_check:
+            if not self.check_inputs(mf,sysndxlist): return
+
+        if debug: return allsystem
+        if self.checkpoint is not None: rkey = self.calc_checkpoint(mf)
+        mf.run()
+        if self.checkpoint is not None: self.checkpoint.save('reflist',rkey,[mf.reflist,mf.seed])
+        self.collect_results(mf,allsystem,allenergy,allkeeps,systemlist,sysndxlist)
+        self.save_files(bothread=True)
+
+    def read_worker(self,filelist,q,stop):
+        """reader thread, put (ndx, system, energy) for each file, None at the end"""
+        try:
+            for cnt,f in enumerate(filelist):
+                if stop.is_set(): return
+                datalist,energylist = self.get_datalist([f])
+                item = (cnt,datalist[0],energylist[0])
+                while not stop.is_set():
+                    try:
+                        q.put(item,timeout=0.5)
+                        break
+                    except queue.Full:
+                        pass
+            item = None
+        except Exception as e:
+            item = e
+        while not stop.is_set():
+            try:
+                q.put(item,timeout=0.5)
+                break
+            except queue.Full:
+                pass
+
+
 class PlotSamples(BulkProcess):
     def __init__(self,probdatafilelist=None,nmsamples=None,nmlist=None,
                 startndx=None,endndx=None,incndx=None,nmranges=None,
@@ -2903,7 +4358,7 @@ class PlotSamples(BulkProcess):
         if len(self.datafilelist) and self.nice and nmlist is not None:
             bo = False
             for i in nmlist:
-                self.choices.append(random.sample(allsystems,i))
+                self.choices.append(random.sample(range(tot),i))
         if len(self.datafilelist) and bo and self.nice and 'datafilelist' in kwargs:
             if tot <= 20:
                 self.info = 'Warning: too few inputs: datafilelist'
@@ -2929,8 +4384,8 @@ class PlotSamples(BulkProcess):
                 self.info = 'Fatal: too large: nmsamples --> total:{:}'.format(tot)
                 self.nice = False
         if len(self.datafilelist) and bo and self.nice:
-            # alias
-            samples = allsystems
+            # choices are index lists on allsystems
+            samples = list(range(tot))
             if startndx is not None: samples = samples[startndx:]
             if endndx is not None: samples = samples[:endndx]
             if nmranges is None: nmranges = 0
@@ -2952,6 +4407,7 @@ class PlotSamples(BulkProcess):
             # to avoid waste of time,
             # only number of samples bigger than 10 will be kept
             self.choices = [i for i in self.choices if len(i) > 10]
+        self.allsystems = allsystems
 
     def run(self):
         bondsdict = {'all':[], }
@@ -2974,15 +4430,33 @@ class PlotSamples(BulkProcess):
             overall_dt = []
             bconlist = []
             aconlist = []
-            for cnt,ms in enumerate(self.choices):
-                print('Note: generate plots on < {:} > sample files ...'.format(cnt+1))
-                mf = Filtration(system=ms,*self.args,**self.kwargs)
-                mf.run()
-                bconlist.append(mf.bcon)
-                aconlist.append(mf.acon)
-                overall_prob_begin.append(mf.prob_begin)
-                overall_prob_final.append(mf.prob_final)
-                overall_dt.append([mf.btol, mf.atol])
+            # descriptors only need to be calculated once
+            mf = Filtration(*self.args,**self.kwargs)
+            if mf.nproc > 1:
+                print('Note: calculating connections on < {:} > processes ...'.format(mf.nproc))
+                bondlist,anglelist = mf.calc_descriptors_parallel(self.allsystems,mf.bcon,mf.acon,mf.nproc)
+            else:
+                print('Note: calculating connections ...')
+                bondlist = mf.calc_square_distance(self.allsystems,mf.bcon)
+                anglelist = mf.calc_angle_degree(self.allsystems,mf.acon)
+            data = (self.allsystems,bondlist,anglelist,self.args,self.kwargs)
+            if mf.nproc > 1:
+                print('Note: generate plots on < {:} > samples by < {:} > processes ...'.format(
+                    len(self.choices),mf.nproc))
+                with multiprocessing.Pool(mf.nproc,initializer=init_samples_worker,initargs=(data,)) as pool:
+                    results = pool.map(calc_samples_worker,self.choices)
+            else:
+                init_samples_worker(data)
+                results = []
+                for cnt,ndxlist in enumerate(self.choices):
+                    print('Note: generate plots on < {:} > sample files ...'.format(cnt+1))
+                    results.append(calc_samples_worker(ndxlist))
+            for rst in results:
+                bconlist.append(rst[2])
+                aconlist.append(rst[3])
+                overall_prob_begin.append(rst[0])
+                overall_prob_final.append(rst[1])
+                overall_dt.append([rst[4], rst[5]])
             
             for i,di in enumerate(overall_prob_begin):
                 df = overall_prob_final[i]
@@ -3027,9 +4501,16 @@ class PlotSamples(BulkProcess):
         # more info
         print('\nNote: random seed: {:}'.format(self.seed))
         if len(self.choices):
-            if 'mode' in self.kwargs and self.kwargs['mode'] is not None:
+            if 'quota' in self.kwargs and self.kwargs['quota']:
+                mode = 'quota'
+            elif 'mode' in self.kwargs and self.kwargs['mode'] is not None:
                 mode = self.kwargs['mode'].lower()
-                mode = 'dynamic' if mode in ['d','dynamic'] else 'static'
+                if mode in ['d','dynamic']:
+                    mode = 'dynamic'
+                elif mode in ['c','connection']:
+                    mode = 'connection'
+                else:
+                    mode = 'static'
             else:
                 mode = 'dynamic'
             print('Note: filtration mode is: {:}'.format(mode))
@@ -3040,6 +4521,10 @@ class PlotSamples(BulkProcess):
                     print('  => calculation is performed for all entries')
                 else:
                     print('  => calculation is performed separately')
+            elif mode == 'connection':
+                print('  => repeats only when all connections are within tolerance')
+            elif mode == 'quota':
+                print('  => farthest point sampling on number: {:}'.format(self.kwargs['quota']))
             else:
                 vndx = self.kwargs['vndx'] if 'vndx' in self.kwargs else None
                 if vndx: print('  => index value is: {:}'.format(vndx))
@@ -3068,10 +4553,11 @@ class PlotSamples(BulkProcess):
         def next(self):
             return self.__next__()
 
-    def save_image_samples(self,datalist,label=None,fname=None):
+    def save_image_samples(self,datalist,label=None,fname=None,npts=None):
         """
         Input:
             datalist: List[dict]: key in dict begin|final|dt
+            npts: int: maximum number of points for each line, default 2000
         """
         # the number of linestyle should be in ODD number
         linestyle = self.CYCLE(['solid','dotted','dashdot',])
@@ -3112,8 +4598,10 @@ class PlotSamples(BulkProcess):
             ftxt = 'Final molnms = {:}'.format(sum(d['final'][0]))
             ix = [d['begin'][1]+d['dt']*i for i in range(len(d['begin'][0]))]
             fx = [d['final'][1]+d['dt']*i for i in range(len(d['final'][0]))]
-            iln, = ax1.plot(ix,d['begin'][0],color=color,linestyle=ils,label=itxt)
-            fln, = ax1.plot(fx,d['final'][0],color=color,linestyle=fls,label=ftxt)
+            ix,iy = downsample_envelope(ix,d['begin'][0],npts)
+            fx,fy = downsample_envelope(fx,d['final'][0],npts)
+            iln, = ax1.plot(ix,list(iy),color=color,linestyle=ils,label=itxt)
+            fln, = ax1.plot(fx,list(fy),color=color,linestyle=fls,label=ftxt)
             lines.append(iln)
             lines.append(fln)
 
@@ -3127,6 +4615,39 @@ class PlotSamples(BulkProcess):
         return fname
 
     def read_probdatafile(self,file):
+        header = read_probdata_binary(file)
+        if header is not None:
+            return self.read_probdatabinary(header)
+        return self.read_probdatatext(file)
+
+    def read_probdatabinary(self,header):
+        """same return as read_probdatatext, counts are zero-copy memoryview"""
+        btol = header['btol'] if header['btol'] is not None else 0.1
+        atol = header['atol'] if header['atol'] is not None else 0.1
+        bonds = {'all':{'begin':[], 'final':[], 'dt':btol}, }
+        angles = {'all':{'begin':[], 'final':[], 'dt':atol}, }
+        for info in header['entries']:
+            data = [info['data'],info['rmin']]
+            if info['mark'] == 'ball':
+                bonds['all'][info['key']] = data
+            elif info['mark'] == 'aall':
+                angles['all'][info['key']] = data
+            elif info['mark'] == 'bpar':
+                bi,bj = sorted(info['con'])
+                key = '{:}-{:}'.format(bi,bj)
+                if key not in bonds: bonds[key] = {}
+                bonds[key][info['key']] = data
+                bonds[key]['dt'] = btol
+            elif info['mark'] == 'apar':
+                ai,a,aj = info['con']
+                if ai > aj: aj, ai = ai, aj
+                key = '{:}-{:}-{:}'.format(ai,a,aj)
+                if key not in angles: angles[key] = {}
+                angles[key][info['key']] = data
+                angles[key]['dt'] = atol
+        return bonds, angles
+
+    def read_probdatatext(self,file):
         def getdata(text,key=None):
             ltmp = text.split()
             if not len(ltmp): return []
@@ -3258,6 +4779,36 @@ class PlotSamples(BulkProcess):
         return bonds, angles
 
 
+SAMPLESDATA = None
+
+
+def init_samples_worker(data):
+    """data : (system, bondlist, anglelist, args, kwargs), shared by samples"""
+    global SAMPLESDATA
+    SAMPLESDATA = data
+
+
+def calc_samples_worker(ndxlist):
+    """Filtration on samples chosen by ndxlist
+
+    Return:
+        (prob_begin, prob_final, bcon, acon, btol, atol)
+    """
+    system,bondlist,anglelist,args,kwargs = SAMPLESDATA
+    if isinstance(system,CompactSystem):
+        sub = system.take(ndxlist)
+    else:
+        sub = [system[i] for i in ndxlist]
+    mf = Filtration(
+        system=sub,
+        prebondlist=[bondlist[i] for i in ndxlist] if len(bondlist) else [],
+        preanglelist=[anglelist[i] for i in ndxlist] if len(anglelist) else [],
+        *args,**kwargs
+    )
+    mf.run()
+    return mf.prob_begin, mf.prob_final, mf.bcon, mf.acon, mf.btol, mf.atol
+
+
 def parsecmd():
     """Parse command line input"""
     def parse_remove_chars(line):
@@ -3329,6 +4880,16 @@ def parsecmd():
         help='turn on static mode calculation, default is in dynamic/all mode',
         action='store_true',
     )
+    parser.add_argument(
+        '--connection',
+        help='turn on connection mode, repeats only when every connection is within tolerance',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-k','--quota',
+        help='turn on quota mode, keep exactly number of molecules by farthest point sampling',
+        type=int,
+    )
     parser.add_argument(
         '--separate',
         help='valid in dynamic mode, change to dynamic/separate mode',
@@ -3397,6 +4958,91 @@ def parsecmd():
         help='turn on angles probability parameters calculation, Boolean',
         action='store_true',
     )
+    parser.add_argument(
+        '-np','--nproc',
+        help='number of processes for descriptors calculation, default is 1',
+        type=int,
+    )
+    parser.add_argument(
+        '--saturation',
+        help='incremental analysis, report new unique rate of each data file in order',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--threshold',
+        help='valid with saturation, yield rate below it is saturated, default is 0.05',
+        type=float,
+    )
+    parser.add_argument(
+        '--patience',
+        help='valid with saturation, number of continuous saturated files, default is 1',
+        type=int,
+    )
+    parser.add_argument(
+        '--saturation-stop',
+        help='valid with saturation, stop processing remaining files once saturated',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--pipeline',
+        help='overlap files reading, calculation and saving, Boolean',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--qsize',
+        help='valid with pipeline, maximum number of read files waiting, default is 2',
+        type=int,
+    )
+    parser.add_argument(
+        '--compact',
+        help='save molecules in compact arrays, reduce memory usage',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--float32',
+        help='valid with compact, save coordinates in float32, precision will be lost',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--no-cache',
+        help='turn off persistent cache of perception results',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--cachedir',
+        help='directory of perception cache, default is ~/.cache/conformation-filtration',
+    )
+    parser.add_argument(
+        '--checkpoint',
+        help='turn on checkpoint, directory of checkpoint, default is filter-checkpoint',
+        nargs='?',
+        const='filter-checkpoint',
+    )
+    parser.add_argument(
+        '--resume',
+        help='resume from checkpoint, completed stages will not be calculated again',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--probformat',
+        help='format of probability data file, [txt, bin, all], default is all',
+        choices=['txt','bin','all'],
+    )
+    parser.add_argument(
+        '--follow',
+        help='follow growing data files, filter and save new molecules on the fly',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--interval',
+        help='valid in follow mode, seconds between two checks, default is 5',
+        type=float,
+    )
+    parser.add_argument(
+        '--timeout',
+        help='valid in follow mode, stop when no new inputs in seconds, default is 600',
+        type=float,
+    )
     parser.add_argument(
         '-nc','--no-force-double-check',
         help='turn off double check prompt info before execution',
@@ -3533,6 +5179,21 @@ def parsecmd():
         'incndx'                    :   None,
         'nmranges'                  :   None,
         'seed'                      :   None,
+        'nproc'                     :   None,
+        'quota'                     :   None,
+        'compact'                   :   None,
+        'bocache'                   :   True,
+        'probformat'                :   None,
+        'cachedir'                  :   None,
+        'typecode'                  :   None,
+        'interval'                  :   None,
+        'timeout'                   :   None,
+        'qsize'                     :   None,
+        'checkpoint'                :   None,
+        'boresume'                  :   None,
+        'threshold'                 :   None,
+        'patience'                  :   None,
+        'bostop'                    :   None,
     }
 
     bod = False
@@ -3563,6 +5224,7 @@ def parsecmd():
         fdict['indexfilelist'] = stmp.split()
 
     if 'static' in args and args.static: fdict['mode'] = 'static'
+    if 'connection' in args and args.connection: fdict['mode'] = 'connection'
     if 'separate' in args and args.separate: fdict['boall'] = False
     if 'vndx' in args: fdict['vndx'] = args.vndx     # be aware of 0.0
     if 'borandom' in args and args.borandom: fdict['borandom'] = True
@@ -3592,11 +5254,35 @@ def parsecmd():
     if 'incndx' in args and args.incndx: fdict['incndx'] = args.incndx
     if 'nmranges' in args and args.nmranges: fdict['nmranges'] = args.nmranges
     if 'seed' in args and args.seed: fdict['seed'] = args.seed
+    if 'nproc' in args and args.nproc: fdict['nproc'] = args.nproc
+    if 'quota' in args and args.quota: fdict['quota'] = args.quota
+    if 'compact' in args and args.compact: fdict['compact'] = True
+    if 'probformat' in args and args.probformat: fdict['probformat'] = args.probformat
+    if 'no_cache' in args and args.no_cache: fdict['bocache'] = False
+    if 'cachedir' in args and args.cachedir: fdict['cachedir'] = args.cachedir
+    if 'float32' in args and args.float32: fdict['typecode'] = 'f'
+    if 'interval' in args and args.interval: fdict['interval'] = args.interval
+    if 'timeout' in args and args.timeout: fdict['timeout'] = args.timeout
+    if 'qsize' in args and args.qsize: fdict['qsize'] = args.qsize
+    if 'checkpoint' in args and args.checkpoint: fdict['checkpoint'] = args.checkpoint
+    if 'resume' in args and args.resume: fdict['boresume'] = True
+    if 'threshold' in args and args.threshold is not None: fdict['threshold'] = args.threshold
+    if 'patience' in args and args.patience: fdict['patience'] = args.patience
+    if 'saturation_stop' in args and args.saturation_stop: fdict['bostop'] = True
 
     print('Note: time: {:}'.format(time.ctime()))
     if 'command' in args:
         print('Note: processing plot ...')
         PS = PlotSamples(**fdict)
+    elif 'follow' in args and args.follow:
+        print('Note: processing data files in follow mode ...')
+        PS = FollowProcess(**fdict)
+    elif 'saturation' in args and args.saturation:
+        print('Note: processing data files in saturation analysis ...')
+        PS = SaturationProcess(**fdict)
+    elif 'pipeline' in args and args.pipeline:
+        print('Note: processing data files in pipeline ...')
+        PS = PipelineProcess(**fdict)
     else:
         print('Note: processing data files ...')
         PS = BulkProcess(**fdict)
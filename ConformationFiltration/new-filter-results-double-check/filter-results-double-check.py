@@ -3,6 +3,7 @@
 import os
 import sys
 import glob
+import time
 
 
 class ReadFile:
@@ -221,15 +222,103 @@ class ReadFile:
 
 
 
+class KDTree:
+    """pure python kd-tree for box range search on low dimensional points
+
+    Inputs:
+        points : 2D List[List[float]] : all points have the same dimension
+    """
+    def __init__(self,points):
+        self.points = points
+        self.dim = len(points[0]) if len(points) else 0
+        self.root = self.build(list(range(len(points))),0)
+
+    def build(self,ndxlist,depth):
+        """node: [index, axis, left, right]"""
+        if not len(ndxlist): return None
+        k = depth % self.dim
+        ndxlist.sort(key=lambda i: self.points[i][k])
+        mid = len(ndxlist) // 2
+        return [ndxlist[mid], k, self.build(ndxlist[:mid],depth+1),
+                self.build(ndxlist[mid+1:],depth+1)]
+
+    def query(self,point,tols):
+        """return indexes of points within tols on every dimension"""
+        results = []
+        stack = [self.root]
+        while len(stack):
+            node = stack.pop()
+            if node is None: continue
+            ndx,k,left,right = node
+            p = self.points[ndx]
+            if all([abs(p[i]-point[i]) <= tols[i] for i in range(self.dim)]):
+                results.append(ndx)
+            if point[k] - tols[k] <= p[k]: stack.append(left)
+            if point[k] + tols[k] >= p[k]: stack.append(right)
+        return results
+
+
+
+def get_hashkey(mol,energy,tol):
+    """quantized atomtypes & coordinates plus energy"""
+    key = [None if energy is None else round(energy/tol)]
+    for at in mol:
+        key.append((at[0],round(at[1]/tol),round(at[2]/tol),round(at[3]/tol)))
+    return tuple(key)
+
+
+
+def get_groupkey(mol,energy):
+    """molecules can only be matched in the same group"""
+    return (energy is None, tuple([at[0] for at in mol]))
+
+
+
+def get_point(mol,energy):
+    """low dimensional point, sum of coordinates, plus energy if exists"""
+    ls = [sum([at[1] for at in mol]), sum([at[2] for at in mol]), sum([at[3] for at in mol])]
+    if energy is not None: ls.append(energy)
+    return ls
+
+
+
+def check_near(rsys,rene,psys,pene,tol):
+    """same as original rule, all differences are not larger than tol"""
+    if rene is not None and abs(rene-pene) > tol: return False
+    for n,ra in enumerate(rsys):
+        pa = psys[n]
+        if abs(pa[1]-ra[1]) > tol or abs(pa[2]-ra[2]) > tol or abs(pa[3]-ra[3]) > tol:
+            return False
+    return True
+
+
+
 USAGE = """
-filter-results-double-check.py   SystemFile   -n IndexFiles
+filter-results-double-check.py   SystemFile   -n IndexFiles   [--tol TOL]
+
+    --tol TOL   : tolerance on coordinates & energy, default 0.000001
+
+    exact hashed matches are checked first, when not found, tolerance
+    based near matches are checked by kd-tree, same as original rule
 """
 
 if len(sys.argv) <= 1:
     print(USAGE)
     exit()
 
-line = ' '.join(sys.argv[1:])
+argv = sys.argv[1:]
+tol = 0.000001
+if '--tol' in argv:
+    ndx = argv.index('--tol')
+    try:
+        tol = float(argv[ndx+1])
+        if tol <= 0.0: raise ValueError
+    except (IndexError,ValueError):
+        print('Wrong: --tol needs a positive number')
+        exit()
+    argv = argv[:ndx] + argv[ndx+2:]
+
+line = ' '.join(argv)
 ltmp = line.split('-n')
 if len(ltmp) != 2:
     print('Wrong: input: < {:} >'.format(line))
@@ -275,51 +364,61 @@ for f in ndxfile:
 
 
 
-for cnt,rsys in enumerate(root_system):
-    rene = root_energy[cnt]
-    bo = True
-    for ndx,psys in enumerate(comp_system):
-        bo = True
-        if len(rsys) == len(psys):
-            pene = comp_energy[ndx]
-            if rene is None:
-                if pene is not None:
-                    bo = False
-            else:
-                if pene is None:
-                    bo = False
-                elif abs(rene-pene) > 0.000001:
-                    bo = False
-            if bo:
-                for n,ra in enumerate(rsys):
-                    pa = psys[n]
-                    if len(ra) != len(pa) or len(ra) != 4:
-                        print('Fatal: how could it be? -- atom-nms')
-                        exit()
-                    if pa[0] != ra[0]:
-                        print('Fatal: how could it be? -- atom-label')
-                        exit()
-                    dx = abs(pa[1]-ra[1])
-                    if dx > 0.000001:
-                        bo = False
-                    else:
-                        dy = abs(pa[2]-ra[2])
-                        if dy > 0.000001:
-                            bo = False
-                        else:
-                            dz = abs(pa[3]-ra[3])
-                            if dz > 0.000001: bo = False
-        else:
-            print('Fatal: how could it be? -- molnms')
-            exit()
-        if bo: break
-    if not bo:
-        print('Fatal: not found')
-        print('Fatal: energy -- {:}'.format(rene))
-        print('Fatal: mol --')
-        for i in rsys: print(i)
+# build index
+mytime = time.time()
+hashdict = {}
+groups = {}
+for ndx,psys in enumerate(comp_system):
+    pene = comp_energy[ndx]
+    hashdict[get_hashkey(psys,pene,tol)] = ndx
+    key = get_groupkey(psys,pene)
+    if key not in groups: groups[key] = []
+    groups[key].append(ndx)
+trees = {}
+for key,ndxlist in groups.items():
+    trees[key] = KDTree([get_point(comp_system[i],comp_energy[i]) for i in ndxlist])
+print('Note: index is built on < {:} > molecules in < {:.3f} > seconds'.format(
+    len(comp_system),time.time()-mytime))
 
 
+mytime = time.time()
+missing = []
+nmnear = 0
+for cnt,rsys in enumerate(root_system):
+    rene = root_energy[cnt]
+    if get_hashkey(rsys,rene,tol) in hashdict: continue
+    # values near bucket boundaries, fall back to tolerance checking
+    bo = False
+    key = get_groupkey(rsys,rene)
+    if key in trees:
+        point = get_point(rsys,rene)
+        # one more tol on sums for round-off errors, results are double checked
+        tols = [tol*(len(rsys)+1) for i in range(3)]
+        if rene is not None: tols.append(tol*2)
+        for i in trees[key].query(point,tols):
+            ndx = groups[key][i]
+            if check_near(rsys,rene,comp_system[ndx],comp_energy[ndx],tol):
+                bo = True
+                break
+    if bo:
+        nmnear += 1
+        continue
+    missing.append(cnt)
+    print('Fatal: not found')
+    print('Fatal: energy -- {:}'.format(rene))
+    print('Fatal: mol --')
+    for i in rsys: print(i)
+used = time.time() - mytime
+
+
+print('Note: checked < {:} > molecules in < {:.3f} > seconds'.format(len(root_system),used))
+if used > 0.0:
+    print('Note: throughput < {:.1f} > molecules/second'.format(len(root_system)/used))
+print('Note: number of near matches < {:} >'.format(nmnear))
+if len(missing):
+    print('Fatal: missing < {:} > of < {:} > molecules, index starts at 1:'.format(
+        len(missing),len(root_system)))
+    print('  => {:}'.format([i+1 for i in missing]))
+else:
+    print('Note: all molecules are found')
 print('Note: done comparing for file < {:} >'.format(sysfile))
-
-
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import json
+import struct
+import mmap
+import array
+import itertools
+import multiprocessing
+import matplotlib
+# non-interactive backend, images are only saved
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+FEATURES = [
+    'version 0.10 : start',
+    'version 0.20 : split to functions',
+    'version 0.30 : add argparse RELEASE',
+    'version 0.40 : solve legend overlap',
+    'version 0.50 : add binary probability data file, multiple inputs',
+    'version 0.60 : streaming reading, parallel rendering, images for each file',
+]
+
+VERSION = FEATURES[-1].split(':')[0].replace('version',' ').strip()
+
+
+class CYCLE:
+    """infinite cycle works similar like itertools.cycle()"""
+    def __init__(self,data):
+        self.data = data
+        self.nm = 0
+    def __iter__(self):
+        return self
+    def __next__(self):
+        if self.nm >= len(self.data): self.nm = 0
+        v = self.data[self.nm]
+        self.nm += 1
+        return v
+    def next(self):
+        return self.__next__()
+
+
+
+
+PROBDATA_MAGIC = b'#CFPD01\n'
+
+
+def readbinfile(file):
+    """read binary file: bulk-probability-data.bin, saved by filter.py
+
+    Return:
+        same as readfile, Y values are zero-copy memoryview on file mapping,
+        None if file is not binary or not valid
+    """
+    with open(file,'rb') as f:
+        if f.read(8) != PROBDATA_MAGIC: return None
+        try:
+            n = struct.unpack('<Q',f.read(8))[0]
+            header = json.loads(f.read(n).decode('utf-8'))
+        except (struct.error,ValueError):
+            return None
+        mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    beg = 16 + n
+    view = memoryview(mm)
+
+    tolerance = [header['btol'], header['atol']]
+    data = {}
+    for info in header['entries']:
+        if info['mark'] not in ['ball','aall']: continue
+        tc = info['typecode']
+        lo = beg + info['offset']
+        hi = lo + info['count']*array.array(tc).itemsize
+        if sys.byteorder == 'little':
+            y = view[lo:hi].cast(tc)
+        else:
+            y = array.array(tc,view[lo:hi].tobytes())
+            y.byteswap()
+        data[(info['mark'],info['key'])] = [info['rmin'],y]
+
+    plotdatalist = {'bonds':[], 'angles':[]}
+    for mark,key,dt in [['ball','bonds',tolerance[0]],['aall','angles',tolerance[1]]]:
+        ini = data[(mark,'begin')] if (mark,'begin') in data else None
+        fin = data[(mark,'final')] if (mark,'final') in data else None
+        if ini is None or fin is None or len(ini[1]) <= 4 or len(fin[1]) <= 4:
+            plotdatalist[key].append([None,None,None,None])
+            continue
+        xil = [ini[0]+dt*s for s in range(len(ini[1]))]
+        xfl = [fin[0]+dt*s for s in range(len(fin[1]))]
+        plotdatalist[key].append([xil,ini[1],xfl,fin[1]])
+
+    filelist = [' '.join(header['files'])]
+    return filelist,plotdatalist,tolerance
+
+
+
+
+def iter_sections(file):
+    """read file: bulk-probability-data.txt, section by section
+
+    Yield:
+        name, plotdata, tolerance : for each @FILE section
+
+            name      :  str   :  file name in @FILE
+            plotdata  :  dict  :  same format as plotdatalist in readfile,
+                                  but only for this section
+            tolerance :  1D List  :  [bonds, angles]
+
+    Note:
+        lines are read one by one, only one section is kept in memory,
+        @TOLERANCE should be placed before @FILE sections, default is 0.1
+    """
+    tolerance = None
+    name = None
+    fdict = {'bonds':[], 'angles':[]}
+    with open(file,'rt') as f:
+        for line in itertools.chain(f,['@FILE  \n']):
+            line = line[:line.find('#')] if line.find('#') != -1 else line
+            line = line.strip()
+            if len(line) == 0: continue
+            if line.find('@TOLERANCE') != -1:
+                tmp = line.split()
+                tolerance = [float(tmp[1]), float(tmp[2])]
+            elif line.find('@FILE') != -1:
+                if name is not None:
+                    tol = [0.1, 0.1] if tolerance is None else tolerance
+                    yield name,parse_section(fdict,tol,file,name),tol
+                tmp = line.split()
+                name = tmp[1] if len(tmp) > 1 else None
+                fdict = {'bonds':[], 'angles':[]}
+            elif name is None:
+                continue
+            elif line.find('@BONDS') != -1 and line.find('ALL') != -1:
+                fdict['bonds'].append(line)
+            elif line.find('@ANGLES') != -1 and line.find('ALL') != -1:
+                fdict['angles'].append(line)
+
+
+
+
+def parse_section(fdict,tolerance,file=None,name=None):
+    """convert lines of one @FILE section to plotdata
+
+    Return:
+        plotdata  :  dict
+            bonds:  List[ List[List[float]] ], }
+                => None, means not exit
+                => [ [ini-X, ini-Y, fin-X, fin-Y ] ]
+            angles:  same as bonds
+    """
+    if len(fdict['bonds']) % 4 != 0 or len(fdict['angles']) % 4 != 0:
+        print('Warning: wrong input file < {:} >'.format(file))
+        print('  => for processing file < {:} >'.format(name))
+        raise ValueError('wrong input')
+
+    plotdata = {'bonds':[], 'angles':[]}
+    for key,dt in [['bonds',tolerance[0]],['angles',tolerance[1]]]:
+        data = fdict[key]
+        for i in range(0,len(data),4):
+            inix,iniy,finx,finy = data[i:i+4]
+            yil = iniy.split()
+            yfl = finy.split()
+            if len(yil) <= 5 or len(yfl) <= 5:
+                plotdata[key].append([None,None,None,None])
+                continue
+            yil = [int(s) for s in yil[1:]]
+            v = float(inix.split()[1])
+            xil = [v+dt*s for s in range(len(yil))]
+            yfl = [int(s) for s in yfl[1:]]
+            v = float(finx.split()[1])
+            xfl = [v+dt*s for s in range(len(yfl))]
+            plotdata[key].append([xil,yil,xfl,yfl])
+    return plotdata
+
+
+
+
+def iter_file(file):
+    """same as iter_sections, binary file is treated as one section
+
+    Note:
+        Y values of binary file are converted to list, thus can be pickled
+    """
+    rst = readbinfile(file)
+    if rst is None:
+        yield from iter_sections(file)
+        return
+    filelist,plotdatalist,tolerance = rst
+    for k in plotdatalist:
+        for d in plotdatalist[k]:
+            if d[0] is not None:
+                d[1] = list(d[1])
+                d[3] = list(d[3])
+    yield filelist[0],plotdatalist,tolerance
+
+
+
+
+def readfile(file):
+    """read file: bulk-probability-data.txt
+
+    Return:
+
+        filelist    :   1D List     :   [file, file, ...]
+
+        plotdatalist:   dict
+            bonds:  List[ List[List[float]] ], }
+                => None, means not exit
+                => [ [ini-X, ini-Y, fin-X, fin-Y ] ]
+            angles:  same as bonds
+
+        tolerance   :  1D List      :   [bonds, angles]
+    """
+    filelist = []
+    plotdatalist = {'bonds':[], 'angles':[]}
+    tolerance = [0.1, 0.1]
+    for name,plotdata,tolerance in iter_sections(file):
+        filelist.append(name)
+        plotdatalist['bonds'].extend(plotdata['bonds'])
+        plotdatalist['angles'].extend(plotdata['angles'])
+    return filelist,plotdatalist,tolerance
+
+
+
+
+def file_gen_new(fname,fextend='txt',foriginal=True,bool_dot=True):
+    """Generate new file name without overwritings
+
+    Args:
+        fname   (str)   :   input file fname
+        fextend (str)   :   file extension
+        foriginal (bool):   whether keep original
+        bool_dot (bool) :   force check dot convention or not
+
+    Returns:
+        str     :   new file name
+    """
+    filename = fname
+    pos = filename.rfind('.')
+    if bool_dot and pos != -1:
+        fname = filename[:pos]
+        fextend = filename[pos:]
+    else:
+        fextend = '.' + fextend
+
+    if foriginal is True:
+        if not os.path.isfile(fname+fextend):
+            return fname+fextend
+
+    i = 1
+    filename = fname
+    while True:
+        fname = filename + '-' + str(i) + fextend
+        if not os.path.isfile(fname): break
+        i += 1
+    return fname
+
+
+
+
+def save_image(datalist,key='bonds',dt=0.1,fname=None):
+    # the number of linestyle should be in ODD number
+    linestyle = CYCLE(['solid','dotted','dashdot',])
+    colors = CYCLE(['b','r','m','g','y','brown','palegreen','deepskyblue'])
+    if key.lower() == 'bonds':
+        info = 'Filtration on Bonds ({:} Angstrom)'.format(dt)
+    else:
+        info = 'Filtration on Angles ({:} Degree)'.format(dt)
+
+    if fname is None: fname = 'bulk-image-compare-{:}.jpg'.format(key)
+
+    # format 2D : List[ List[int,int] ]
+    datalist = [i for i in datalist if i[0] is not None]
+    
+    molnms = [[sum(i[1]),sum(i[3])] for i in datalist]
+    reflist = [i[0] for i in molnms]
+    reflist = sorted(range(len(reflist)), key=lambda k: reflist[k])
+
+    sortdatalist = [datalist[i] for i in reflist]
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, gridspec_kw={'width_ratios': [4,1]})
+    fig.set_figheight(6)
+    fig.set_figwidth(10)
+
+    lines = []
+    for d in sortdatalist:
+        color = colors.next()
+        ils = linestyle.next()
+        fls = linestyle.next()
+        itxt = 'Initial Mols = {:}'.format(sum(d[1]))
+        ftxt = 'Final Mols = {:}'.format(sum(d[3]))
+        iln, = ax1.plot(d[0],list(d[1]),color=color,linestyle=ils,label=itxt)
+        fln, = ax1.plot(d[2],list(d[3]),color=color,linestyle=fls,label=ftxt)
+        lines.append(iln)
+        lines.append(fln)
+    ax1.set_title(info)
+    
+    ax2.axis('off')
+    ax2.legend(handles=lines,loc='center')
+    plt.tight_layout()
+
+    print('Note: image file is saved to < {:} >'.format(fname))
+    plt.savefig(fname)
+    plt.close()
+
+
+
+
+def save_image_worker(args):
+    """args : (datalist, key, dt, fname), for multiprocessing"""
+    datalist,key,dt,fname = args
+    save_image(datalist,key=key,dt=dt,fname=fname)
+    return fname
+
+
+
+
+def dir_gen_new(dname):
+    """Generate new directory name without overwritings"""
+    if not os.path.exists(dname): return dname
+    i = 1
+    while os.path.exists(dname+'-'+str(i)): i += 1
+    return dname + '-' + str(i)
+
+
+
+
+def parsecmd():
+    """Parse command line input"""
+    parser = argparse.ArgumentParser(
+        description='Plot compare results from Confromation Filtration',
+        allow_abbrev=False,
+    )
+    parser.add_argument(
+        '-v','--version',
+        action='version',
+        version=VERSION,
+    )
+    parser.add_argument(
+        '-f','--file',
+        help='Files: bulk-probability-data, txt or bin',
+        nargs='+',
+    )
+    parser.add_argument(
+        '--features',
+        help='Show develop features',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-o','--fname',
+        help='Output file name',
+    )
+    parser.add_argument(
+        '--each',
+        help='Generate compare images for each @FILE section, in a new directory',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-np','--nproc',
+        help='Number of processes for images rendering, default is 1',
+        type=int,
+    )
+
+    if len(sys.argv) == 1:
+        parser.print_help()
+        exit()
+
+    args = parser.parse_args(sys.argv[1:])
+    if args.features:
+        for i in FEATURES:
+            print(i)
+        exit()
+    
+    if args.file is None:
+        print('Warning: -f/--file is missing')
+        exit()
+
+    return args
+
+
+
+
+def main():
+    args = parsecmd()
+    nproc = args.nproc if args.nproc and args.nproc > 1 else 1
+
+    dname = None
+    if args.each:
+        dname = dir_gen_new('bulk-image-each' if args.fname is None else args.fname)
+        os.makedirs(dname)
+        print('Note: images for each file are saved in directory < {:} >'.format(dname))
+
+    combined = {'bonds':[], 'angles':[], 'tolerance':None}
+    def gen_tasks():
+        """compare images for each section, combined data are accumulated"""
+        cnt = 0
+        for file in args.file:
+            bonew = True
+            for name,plotdata,tol in iter_file(file):
+                bonew = False
+                if combined['tolerance'] is None: combined['tolerance'] = tol
+                # special file < OVERALL > is ignored
+                if name.find('OVERALL') != -1: continue
+                combined['bonds'].extend(plotdata['bonds'])
+                combined['angles'].extend(plotdata['angles'])
+                if dname is None: continue
+                cnt += 1
+                for key,dt in [['bonds',tol[0]],['angles',tol[1]]]:
+                    if not len([i for i in plotdata[key] if i[0] is not None]): continue
+                    fname = os.path.join(dname,'bulk-image-compare-{:}-{:}.jpg'.format(key,cnt))
+                    yield plotdata[key],key,dt,fname
+            if bonew: print('Warning: No inputs < {:} >'.format(file))
+
+    tasks = gen_tasks()
+    if nproc > 1:
+        with multiprocessing.Pool(nproc) as pool:
+            # bounded, only limited sections are waiting in memory
+            while True:
+                chunk = list(itertools.islice(tasks,nproc*4))
+                if not len(chunk): break
+                pool.map(save_image_worker,chunk)
+    else:
+        for t in tasks: save_image_worker(t)
+
+    if combined['tolerance'] is None:
+        print('Warning: No inputs')
+        exit()
+
+    jobs = []
+    for n,key in enumerate(['bonds','angles']):
+        datalist = combined[key]
+        dt = combined['tolerance'][n]
+        if args.fname is None:
+            fname = 'bulk-image-compare-{:}'.format(key)
+            fname = file_gen_new(fname,'jpg')
+        else:
+            fname = file_gen_new(args.fname,'jpg')
+            # make sure names are different
+            open(fname,'wb').close()
+        jobs.append((datalist,key,dt,fname))
+    if nproc > 1:
+        with multiprocessing.Pool(min(nproc,len(jobs))) as pool:
+            pool.map(save_image_worker,jobs)
+    else:
+        for t in jobs: save_image_worker(t)
+
+
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,13 @@
 
 import io
 import os
+import re
+import collections.abc
+import multiprocessing
 import numpy as np
 import itertools
+import functools
+import math
 import matplotlib.pyplot as plt
 
 # for testing
@@ -15,6 +20,17 @@ FEATURES = [
     'version 0.3    : add unified ParConfig',
     'version 0.4    : add func translation',
     'version 0.4.1  : small fix on quaternion maxtrix',
+    'version 0.5.0  : add bulk parsing on regular layout',
+    'version 0.6.0  : add vectorized frames in VaryBond & VaryZoom',
+    'version 0.7.0  : add batched rotations in VaryAngle & surroundings',
+    'version 0.8.0  : add compact Atom and SystemFrames',
+    'version 0.9.0  : add vectorized MolSampling',
+    'version 0.10.0 : add seeded random streams & parallel MolSampling',
+    'version 0.11.0 : add batched validation in FixBonds & FixNonBonds',
+    'version 0.12.0 : add cached nonbonded pairs on topology',
+    'version 0.13.0 : add cell-list bond perception in FixBonds',
+    'version 0.14.0 : add lazy parameter sets & streaming run in GenBonds',
+    'version 0.15.0 : add process pool on parameter sets in GenBonds',
 ]
 
 
@@ -98,6 +114,12 @@ For com file:
 """
 
 
+# regular layout in data files, used for fast bulk parsing
+BLANKLINE = re.compile(r'\n(?:[ \t\r\f\v]*\n)+')
+HEADLINE = re.compile(r'\n(?=[ \t]*#)')
+ATOMLINES = re.compile(r'(?:[ \t]*\S+[ \t]+\S+[ \t]+\S+[ \t]+\S+[ \t\r]*(?:\n|$))+')
+
+
 
 class ReadFileMultiple:
     """
@@ -138,14 +160,69 @@ class ReadFileMultiple:
 
     def run(self):
         print('Note: reading file < {:} > ...'.format(self.file))
+        # file can only be opened once, it may be a file descriptor
+        with open(self.file,mode='rt') as f:
+            text = f.read()
+        if self.read_bulk(text): return
         fn = getattr(self,'read_'+self.ext)
-        fn()
+        fn(text.split('\n'))
 
 
 
-    def read_xsf(self):
-        with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+    def read_bulk(self,text):
+        """fast path for regular layout, molecules are parsed in bulk
+
+        Rule:
+            every atom line has exactly four entries, otherwise, False is
+            returned, then per-line parser has to be used for warnings
+        """
+        text = text.strip()
+        if len(text) == 0: return False
+
+        if self.ext == 'xsf':
+            # blank lines are meaningless in xsf
+            blocks = HEADLINE.split(BLANKLINE.sub('\n',text))
+            if blocks[0].lstrip()[:1] != '#':
+                if blocks[0].find('#') != -1: return False
+                blocks = blocks[1:]
+        else:
+            blocks = BLANKLINE.split(text)
+
+        system = []
+        for block in blocks:
+            block = block.lstrip()
+            if self.ext == 'txt':
+                if block[0] == '#': block = block.partition('\n')[2]
+            elif self.ext == 'xyz':
+                atomnum, _, block = block.partition('\n')
+                block = block.partition('\n')[2]
+            else:
+                block = block.partition('\n')[2]
+                head, _, block = block.partition('\n')
+                if head.strip() != 'ATOMS' or block.find('#') != -1: return False
+            if not ATOMLINES.fullmatch(block): return False
+
+            tok = block.split()
+            if self.ext == 'xyz':
+                try:
+                    if int(atomnum) * 4 != len(tok): return False
+                except ValueError:
+                    return False
+            tok = iter(tok)
+            try:
+                system.append([[a,float(x),float(y),float(z)] for a,x,y,z in zip(tok,tok,tok,tok)])
+            except ValueError:
+                return False
+
+        self.system = system
+        return True
+
+
+
+    def read_xsf(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
 
         promol = []
         i = 0
@@ -212,9 +289,10 @@ class ReadFileMultiple:
 
 
 
-    def read_txt(self):
-        with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+    def read_txt(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
 
         # List[List[[atomtype, x, y, z], ...]]
         promol = []
@@ -262,9 +340,10 @@ class ReadFileMultiple:
 
 
 
-    def read_xyz(self):
-        with open(self.file,mode='rt') as f:
-            profile = f.readlines()
+    def read_xyz(self,profile=None):
+        if profile is None:
+            with open(self.file,mode='rt') as f:
+                profile = f.readlines()
 
         # List[List[[atomtype, x, y, z], ...]]
         promol = []
@@ -641,6 +720,9 @@ class AtomInfo:
 
 
     class Atom:
+        # no per-instance dict, be aware of memory for numerous generations
+        __slots__ = ('s','n','r','m','name','xyz')
+
         def __init__(self,s,n,r,m,name,xyz):
             self.s = s
             self.n = n
@@ -649,6 +731,11 @@ class AtomInfo:
             self.name = name
             self.xyz = xyz
 
+        @property
+        def __dict__(self):
+            # backward compatibility, mostly used for printing
+            return {k:getattr(self,k) for k in self.__slots__}
+
 
 
     def copy_atom(self,atom):
@@ -831,6 +918,74 @@ FAI = AtomInfo()
 
 
 
+class SystemFrames(collections.abc.Sequence):
+    """compact container for generations of the same system
+
+    Args:
+        system : 2D n*nAtom : [ [Atom, ...],  ...] | SystemFrames, reference
+        frames : 3D num*nAtom*3f : coordinates, default reference system itself
+
+    Attributes:
+        s | n | r | m | name : 1D nAtom : shared atomic table for all generations
+        molnms : 1D List[int] : number of atoms in each molecule
+        natoms : int
+        frames : 3D num*nAtom*3f : numpy array
+
+    Note:
+        it works like 3D List[ System[Mol[Atom, ...], ...], ...], while
+        each system is generated on the fly, thus modification on it will
+        not change the container, slicing returns a new container
+    """
+    def __init__(self,system,frames=None,*args,**kwargs):
+        if isinstance(system,SystemFrames):
+            self.s = system.s
+            self.n = system.n
+            self.r = system.r
+            self.m = system.m
+            self.name = system.name
+            self.molnms = system.molnms
+            if frames is None: frames = system.frames
+        else:
+            atoms = [at for mol in system for at in mol]
+            self.s = [at.s for at in atoms]
+            self.n = [at.n for at in atoms]
+            self.r = [at.r for at in atoms]
+            self.m = [at.m for at in atoms]
+            self.name = [at.name for at in atoms]
+            self.molnms = [len(mol) for mol in system]
+            if frames is None: frames = [at.xyz for at in atoms]
+        self.natoms = len(self.s)
+        self.frames = np.asarray(frames,dtype=float).reshape(-1,self.natoms,3)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self,ndx):
+        if isinstance(ndx,slice):
+            return self.take(range(*ndx.indices(len(self))))
+        if ndx < 0: ndx += len(self)
+        if ndx < 0 or ndx >= len(self): raise IndexError('index out of range')
+        xyzs = self.frames[ndx].tolist()
+        system = []
+        k = 0
+        for nm in self.molnms:
+            mol = []
+            for i in range(k,k+nm):
+                mol.append(FAI.Atom(self.s[i],self.n[i],self.r[i],self.m[i],self.name[i],xyzs[i]))
+            system.append(mol)
+            k += nm
+        return system
+
+    def take(self,ndxlist):
+        """return new SystemFrames on index list, atomic table is shared"""
+        return SystemFrames(self,self.frames[np.array(ndxlist,dtype=int).reshape(-1)])
+
+    def getsizeof(self):
+        return self.frames.nbytes
+
+
+
+
 class ClosedForm:
     """Calculate best fit structure for two sets coordinates
 
@@ -996,6 +1151,36 @@ class ClosedForm:
 
 
 
+def test_class_SystemFrames():
+    system = [[FAI.get_atom(s='h'), FAI.get_atom(s='c',xyz=[1,1,1])],
+            [FAI.get_atom(s='o',xyz=[1,2,3])]]
+
+    sf = SystemFrames(system)
+    assert len(sf) == 1
+    assert sf.natoms == 3
+    assert sf.molnms == [2,1]
+    assert [[at.__dict__ for at in mol] for mol in sf[0]] == \
+        [[at.__dict__ for at in mol] for mol in system]
+
+    frames = np.arange(4*3*3).reshape(4,3,3)
+    sf = SystemFrames(system,frames)
+    assert len(sf) == 4
+    assert sf[-1][1][0].s == 'O'
+    assert sf[-1][1][0].xyz == [33.0, 34.0, 35.0]
+
+    # modification is not saved
+    sf[0][0][0].xyz[0] = 100.0
+    assert sf[0][0][0].xyz[0] == 0.0
+
+    new = sf[1:3]
+    assert len(new) == 2
+    assert new.s is sf.s
+    assert np.allclose(new.frames, frames[1:3])
+    assert np.allclose(sf.take([3,0]).frames, frames[[3,0]])
+
+
+
+
 def test_class_ClosedForm():
     CF = ClosedForm()
 
@@ -1093,6 +1278,73 @@ def rotation(pd=None,po=None,angle=None,v=None):
 
 
 
+def rotation_batch(pd=None,po=None,angles=None,v=None):
+    """rotation matrices for axis po->pd in all given angles, vectorized rotation
+
+    Args:
+        angles : 1D nf : in degree, default [5.0]
+
+    Return:
+        R : 3D n*3*4f : numpy array, first three rows of rotation on each angle
+    """
+    if po is None and pd is None and v is not None:
+        po = [0.0, 0.0, 0.0]
+        pd = v
+    else:
+        po = [0.0, 0.0, 0.0] if po is None else po
+        pd = [0.0, 0.0, 1.0] if pd is None else pd
+    angles = [5.0] if angles is None else angles
+
+    angles = np.array(angles,dtype=float).reshape(-1) / 180.0 * np.pi
+    l = [pd[i]-po[i] for i in range(3)]
+    tt = sum([i*i for i in l])
+    t = pow(tt,0.5)
+    u,v,w = l[0]/t, l[1]/t, l[2]/t
+    a,b,c = po[0],po[1],po[2]
+    cg = np.cos(angles)
+    sg = np.sin(angles)
+
+    # same element-wise formulas as rotation, thus same values
+    R = np.empty((len(angles),3,4))
+    R[:,0,0] = u*u + (v*v + w*w)*cg
+    R[:,0,1] = u*v*(1-cg) - w*sg
+    R[:,0,2] = u*w*(1-cg) + v*sg
+    R[:,0,3] = (a*(v*v+w*w) - u*(b*v+c*w))*(1-cg) + (b*w-c*v)*sg
+
+    R[:,1,0] = u*v*(1-cg) + w*sg
+    R[:,1,1] = v*v + (u*u+w*w)*cg
+    R[:,1,2] = v*w*(1-cg) - u*sg
+    R[:,1,3] = (b*(u*u+w*w) - v*(a*u+c*w))*(1-cg) + (c*u-a*w)*sg
+
+    R[:,2,0] = u*w*(1-cg) - v*sg
+    R[:,2,1] = v*w*(1-cg) + u*sg
+    R[:,2,2] = w*w + (u*u+v*v)*cg
+    R[:,2,3] = (c*(u*u+v*v) - w*(a*u+b*v))*(1-cg) + (a*v-b*u)*sg
+
+    return R
+
+
+
+def rotation_apply(R,pts):
+    """apply all rotation matrices on all points
+
+    Args:
+        R   : 3D n*3*4f : from rotation_batch
+        pts : 2D m*3f
+
+    Return:
+        vls : 3D n*m*3f : numpy array
+
+    Note:
+        summation is in the same order of [x,y,z,1], no round-off differences
+        to the point-wise matrix operation, while einsum does not guarantee it
+    """
+    pts = np.array(pts,dtype=float).reshape(-1,3)
+    p = np.hstack([pts,np.ones((len(pts),1))])
+    return (R[:,np.newaxis,:,:] * p[np.newaxis,:,np.newaxis,:]).sum(axis=-1)
+
+
+
 
 def test_func_rotation():
     def multi(R,p):
@@ -1165,6 +1417,25 @@ def test_func_rotation():
 
 
 
+def test_func_rotation_batch():
+    po = [1,7,3]
+    pd = [3,16,9]
+    pts = [[5,8,4], [0,0,1], [-1,2,0.5]]
+    angles = [26, 60, 90.5, 135, 359]
+    R = rotation_batch(pd=pd,po=po,angles=angles)
+    assert R.shape == (5,3,4)
+    vls = rotation_apply(R,pts)
+    assert vls.shape == (5,3,3)
+    fv = VaryAngle([[FAI.get_atom(s='h')]],type='a',idpts=[[0,0]])
+    for i,angle in enumerate(angles):
+        mat = rotation(pd=pd,po=po,angle=angle)
+        assert np.array_equal(R[i],np.array(mat)[:3])
+        for j,p in enumerate(pts):
+            assert np.array_equal(vls[i][j],fv.quaternion(p,mat))
+
+
+
+
 def translation(pd=None,po=None,v=None):
     """translation matrix for vector determined by po->pd
 
@@ -1893,6 +2164,28 @@ class ParConfig:
 
 
 
+    def calc_coords(self):
+        """
+        Return:
+            coords : 2D nAtom*3f : numpy array, flattened coordinates of system
+        """
+        coords = [at.xyz for mol in self.system for at in mol]
+        return np.array(coords,dtype=float).reshape(-1,3)
+
+
+
+    def calc_mask(self):
+        """
+        Return:
+            mask : 1D nAtom : numpy bool array, True for atoms in self.idpts
+        """
+        mask = np.zeros(self._acclist[-1],dtype=bool)
+        for ndx in self.idpts:
+            mask[self._acclist[ndx[0]]+ndx[1]] = True
+        return mask
+
+
+
 
 def test_class_ParConfig():
     ftxt = """
@@ -2078,27 +2371,33 @@ class VaryBond(ParConfig):
 
 
 
-    def run(self):
+    def run(self,boatoms=None):
+        """
+        Args:
+            boatoms (bool): whether materialize frames to Atom lists, default True
+
+        Attributes:
+            frames : 3D num*nAtom*3f : numpy array, all generations in one go
+            sysnew : SystemFrames    : only when boatoms is True
+            syspts : 3D num*pts
+        """
+        boatoms = False if boatoms is False else True
         self.sysnew = []
         self.syspts = []
+        self.frames = None
         mat = translation(v=self.v)
-        for i in range(1,self.num+1):
-            if len(self.idpts) != 0:
-                mol = [[FAI.copy_atom(i) for i in j] for j in self.system]
-                for ndx in self.idpts:
-                    mol[ndx[0]][ndx[1]].xyz[0] += self.inc * i * mat[0]
-                    mol[ndx[0]][ndx[1]].xyz[1] += self.inc * i * mat[1]
-                    mol[ndx[0]][ndx[1]].xyz[2] += self.inc * i * mat[2]
-                self.sysnew.append(mol)
-
-            if len(self.pts) != 0:
-                ls = []
-                for pt in self.pts:
-                    x = pt[0] + self.inc * i * mat[0]
-                    y = pt[1] + self.inc * i * mat[1]
-                    z = pt[2] + self.inc * i * mat[2]
-                    ls.append([x,y,z])
-                self.syspts.append(ls)
+        # shifts on each generation, 2D num*3f
+        shift = np.outer(self.inc*np.arange(1,self.num+1),mat)
+        if len(self.idpts) != 0:
+            base = self.calc_coords()
+            self.frames = np.repeat(base[np.newaxis,:,:],self.num,axis=0)
+            mask = self.calc_mask()
+            self.frames[:,mask,:] += shift[:,np.newaxis,:]
+            if boatoms: self.sysnew = SystemFrames(self.system,self.frames)
+
+        if len(self.pts) != 0:
+            pts = np.array(self.pts,dtype=float)
+            self.syspts = (pts[np.newaxis,:,:] + shift[:,np.newaxis,:]).tolist()
 
 
 
@@ -2130,6 +2429,15 @@ def test_class_VaryBond():
         print()
         print()
 
+    # frames are always in the same order as sysnew
+    assert fv.frames.shape == (fv.num,4,3)
+    xyz = [[a.xyz for m in s for a in m] for s in fv.sysnew]
+    assert np.allclose(fv.frames, xyz)
+
+    fv.run(boatoms=False)
+    assert len(fv.sysnew) == 0
+    assert np.allclose(fv.frames, xyz)
+
 
 
 
@@ -2147,22 +2455,31 @@ class VaryAngle(ParConfig):
 
 
 
-    def run(self):
+    def run(self,boatoms=None):
+        """
+        Args:
+            boatoms (bool): whether materialize frames to Atom lists, default True
+
+        Attributes:
+            frames : 3D num*nAtom*3f : numpy array, all generations in one go
+            sysnew : SystemFrames    : only when boatoms is True
+            syspts : 3D num*pts
+        """
+        boatoms = False if boatoms is False else True
         self.sysnew = []
         self.syspts = []
-        for i in range(1,self.num+1):
-            if len(self.idpts) != 0:
-                mol = [[FAI.copy_atom(i) for i in j] for j in self.system]
-                mat = rotation(v=self.v,angle=self.inc*i)
-                for ndx in self.idpts:
-                    mol[ndx[0]][ndx[1]].xyz = self.quaternion(mol[ndx[0]][ndx[1]].xyz, mat)
-                self.sysnew.append(mol)
-
-            if len(self.pts) != 0:
-                ls = []
-                for pt in self.pts:
-                    ls.append( self.quaternion(pt, mat) )
-                self.syspts.append(ls)
+        self.frames = None
+        # rotation matrices on each generation, 3D num*3*4f
+        mats = rotation_batch(v=self.v,angles=self.inc*np.arange(1,self.num+1))
+        if len(self.idpts) != 0:
+            base = self.calc_coords()
+            self.frames = np.repeat(base[np.newaxis,:,:],self.num,axis=0)
+            mask = self.calc_mask()
+            self.frames[:,mask,:] = rotation_apply(mats,base[mask])
+            if boatoms: self.sysnew = SystemFrames(self.system,self.frames)
+
+        if len(self.pts) != 0:
+            self.syspts = rotation_apply(mats,self.pts).tolist()
 
 
 
@@ -2356,8 +2673,9 @@ class MolSampling:
 
         mode (str|int) : all | partial | int | None, sample on setting, low priority
 
-        seed (int): seed for random generation
+        seed (int): seed for random generation, root of SeedSequence
         num (int) : number of generations, default 5
+        shard (int) : number of generations on each random stream, default 1000
 
         sysnew  : 3D n*system
         axes (str) : axes to be sampled, x, y, z, default x*y*z*
@@ -2370,11 +2688,19 @@ class MolSampling:
         radius(float): uniformly all radius, highest priority
     """
     def __init__(self,system,*args,ipts=None,idpts=None,mode=None,num=None,seed=None,
-                axes=None,radius=None,**kwargs):
+                axes=None,radius=None,shard=None,**kwargs):
         self.nice = True
         self.info = ''
         self.system = system
 
+        if seed is None:
+            # extract a seed
+            self.seed = np.random.SeedSequence().entropy
+        else:
+            self.seed = seed
+        # stream for random choice of sampled atoms, generations use child streams
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.seed))
+
         myipts = []
         myir = []
         if ipts is not None:
@@ -2472,9 +2798,9 @@ class MolSampling:
             self.info = 'Note: mode all, sampling number: {:}'.format(len(totlist))
             self.idpts = totlist
         elif isinstance(mode,str) and mode.lower() in ['partial','random','p']:
-            nm = np.random.randint(len(totlist))
+            nm = self.rng.integers(len(totlist))
             self.info = 'Note: mode partial, sampling number: {:}'.format(nm)
-            refid = np.random.choice(range(len(totlist)),nm)
+            refid = self.rng.choice(len(totlist),nm)
             self.idpts = [totlist[i] for i in refid]
         elif isinstance(mode,int):
             if mode > len(totlist):
@@ -2482,7 +2808,7 @@ class MolSampling:
                 print(self.info)
                 self.idpts = totlist
             else:
-                refid = np.random.choice(range(len(totlist)),mode)
+                refid = self.rng.choice(len(totlist),mode)
                 self.idpts = [totlist[i] for i in refid]
         else:
             self.nice = False
@@ -2490,16 +2816,18 @@ class MolSampling:
             print(self.info)
             return
 
-        if seed is None:
-            np.random.seed()
-            # extract a seed
-            self.seed = np.random.get_state()[1][2]
-        else:
-            self.seed = seed
-        np.random.seed(self.seed)
-
         self.num = 5 if num is None else num
 
+        if shard is None:
+            self.shard = 1000
+        elif isinstance(shard,int) and shard > 0:
+            self.shard = shard
+        else:
+            self.nice = False
+            self.info = 'Fatal: wrong configure: shard: {:}'.format(shard)
+            print(self.info)
+            return
+
         bo = False
         if axes is None:
             self.axes = 'x*y*z*'
@@ -2566,54 +2894,88 @@ class MolSampling:
 
 
 
-    def run(self):
+    def run(self,boatoms=None,nproc=None):
+        """
+        Args:
+            boatoms (bool): whether set sysnew, default True
+            nproc (int): number of processes, default 1
+
+        Attributes:
+            frames : 3D num*nAtom*3f : numpy array, all generations in one go
+            sysnew : SystemFrames    : only when boatoms is True
+
+        Note:
+            generations are split into shards in size of self.shard, each shard
+            has its own child stream of SeedSequence(self.seed), thus results
+            are bit-identical no matter how many processes are used
+        """
+        boatoms = False if boatoms is False else True
+        nproc = 1 if nproc is None else max(nproc,1)
         self.sysnew = []
-        for i in range(self.num):
-            mol = [[FAI.copy_atom(i) for i in j] for j in self.system]
-            self.sysnew.append(mol)
-        
-        # in-place update
-        if 'x+' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[0] += np.random.rand() * p[2]
-        elif 'x-' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[0] -= np.random.rand() * p[2]
-        elif 'x*' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    tmp = np.random.choice([-1,0,1],1)[0]
-                    mol[p[0]][p[1]].xyz[0] += np.random.rand() * p[2] * tmp
-        
-        if 'y+' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[1] += np.random.rand() * p[2]
-        elif 'y-' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[1] -= np.random.rand() * p[2]
-        elif 'y*' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    tmp = np.random.choice([-1,0,1],1)[0]
-                    mol[p[0]][p[1]].xyz[1] += np.random.rand() * p[2] * tmp
-        
-        if 'z+' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[2] += np.random.rand() * p[2]
-        elif 'z-' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    mol[p[0]][p[1]].xyz[2] -= np.random.rand() * p[2]
-        elif 'z*' in self.axes:
-            for mol in self.sysnew:
-                for p in self.idpts:
-                    tmp = np.random.choice([-1,0,1],1)[0]
-                    mol[p[0]][p[1]].xyz[2] += np.random.rand() * p[2] * tmp
+        acclist = [0,]
+        for mol in self.system: acclist.append(acclist[-1]+len(mol))
+        base = [at.xyz for mol in self.system for at in mol]
+        base = np.array(base,dtype=float).reshape(-1,3)
+        self.frames = np.repeat(base[np.newaxis,:,:],self.num,axis=0)
+
+        # axis/sign mask, 0 means not sampled, 2 means random in [-1,0,1]
+        signs = np.zeros(3)
+        for i,ax in enumerate('xyz'):
+            if ax+'+' in self.axes:
+                signs[i] = 1
+            elif ax+'-' in self.axes:
+                signs[i] = -1
+            elif ax+'*' in self.axes:
+                signs[i] = 2
+
+        if len(self.idpts) != 0 and self.num > 0:
+            ndxs = [acclist[p[0]]+p[1] for p in self.idpts]
+            radius = np.array([p[2] for p in self.idpts],dtype=float)
+            tasks = []
+            for key,beg in enumerate(range(0,self.num,self.shard)):
+                num = min(self.shard,self.num-beg)
+                tasks.append([self.seed,key,num,radius,signs])
+            if nproc > 1 and len(tasks) > 1:
+                with multiprocessing.Pool(min(nproc,len(tasks))) as pool:
+                    disps = pool.map(calc_sampling_shard,tasks)
+            else:
+                disps = [calc_sampling_shard(t) for t in tasks]
+            disp = np.concatenate(disps)
+            if len(set(ndxs)) != len(ndxs):
+                # repeats may exist in idpts on random mode
+                np.add.at(self.frames,(slice(None),ndxs),disp)
+            elif ndxs == list(range(ndxs[0],ndxs[-1]+1)):
+                self.frames[:,ndxs[0]:ndxs[-1]+1,:] += disp
+            else:
+                self.frames[:,ndxs,:] += disp
+
+        if boatoms: self.sysnew = SystemFrames(self.system,self.frames)
+
+
+
+
+def calc_sampling_shard(args):
+    """random displacements on one shard of MolSampling generations
+
+    Args:
+        args : [seed, key, num, radius, signs]
+            key (int) : shard index, spawn key of SeedSequence(seed)
+            radius : 1D n_idpts
+            signs  : 1D 3f, axis/sign mask
+
+    Return:
+        disp : 3D num*n_idpts*3f
+
+    Note:
+        all random numbers are drawn in one batch, on shape (2,num,n_idpts,3),
+        first is for displacements, second is for random signs on axis '*'
+    """
+    seed,key,num,radius,signs = args
+    rng = np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(key,)))
+    rand = rng.random((2,num,len(radius),3))
+    choice = np.floor(rand[1]*3) - 1
+    fac = np.where(signs == 2, choice, signs)
+    return rand[0] * radius[np.newaxis,:,np.newaxis] * fac
 
 
 
@@ -2660,6 +3022,29 @@ def test_class_MolSampling():
         print()
 
 
+    # displacements are inside the radius, on the given direction
+    fv = MolSampling(system,idpts=[[0,1],[1,1]],axes='y-x+',radius=2,num=1000,seed=7)
+    fv.run()
+    assert fv.frames.shape == (1000,4,3)
+    ref = np.array([[at.xyz for mol in system for at in mol]])
+    disp = fv.frames - ref
+    assert np.allclose(disp[:,[0,2],:], 0.0)
+    assert np.all(disp[:,[1,3],0] >= 0.0) and np.all(disp[:,[1,3],0] < 2.0)
+    assert np.all(disp[:,[1,3],1] <= 0.0) and np.all(disp[:,[1,3],1] > -2.0)
+    assert np.allclose(disp[:,:,2], 0.0)
+
+    # same seed, same generations
+    fv2 = MolSampling(system,idpts=[[0,1],[1,1]],axes='y-x+',radius=2,num=1000,seed=7)
+    fv2.run()
+    assert np.array_equal(fv.frames, fv2.frames)
+
+    # same results in parallel
+    fv = MolSampling(system,mode='all',num=2500,seed=11,shard=300)
+    fv.run()
+    fv2 = MolSampling(system,mode='all',num=2500,seed=11,shard=300)
+    fv2.run(nproc=3)
+    assert np.array_equal(fv.frames, fv2.frames)
+
     fv = MolSampling(system,ipts=[[0,2],2],idpts=[[0,0,1]])
     assert fv.nice
     assert len(fv.idpts) == 2
@@ -2732,6 +3117,9 @@ class FixBonds:
 
         sysnew will be updated filtered results after self.run() is executed
 
+    Attributes:
+        reflist : 2D [[mi,ai,mj,aj,dt], ...] : hard-coded bcon, calculated on use
+
     Reference:
         Zhang, Q., et al.
         A rule-based algorithm for automatic bond type perception.
@@ -2842,93 +3230,154 @@ class FixBonds:
 
 
     def calc_bond_perception(self,system,boall=True):
+        """cell-list neighbor search, cell size is maximum radius cutoff
+
+        Return:
+            bcon : 2D n*2i : pairs [i,j] (i < j), sorted, same as pair-wise
+                             checking by (dd > 0.8 and dd < (ri+rj+0.4)**2)
+        """
         if len(system) == 1 and len(system[0]) == 1: return []
-        bcon = []
-        if boall:
-            # squeeze system to 1D
-            systmp = [at for mol in system for at in mol]
-            for i,ai in enumerate(systmp[:-1]):
-                k = i + 1
-                for j,aj in enumerate(systmp[k:]):
-                    dx = aj.xyz[0] - ai.xyz[0]
-                    dy = aj.xyz[1] - ai.xyz[1]
-                    dz = aj.xyz[2] - ai.xyz[2]
-                    dd = dx*dx + dy*dy + dz*dz
-                    t = ai.r + aj.r + 0.4
-                    if dd > 0.8 and dd < t*t:
-                        bcon.append([i,j+k])
-        else:
-            tot = 0
-            for systmp in system:
-                for i,ai in enumerate(systmp[:-1]):
-                    k = i + 1
-                    for j,aj in enumerate(systmp[k:]):
-                        dx = aj.xyz[0] - ai.xyz[0]
-                        dy = aj.xyz[1] - ai.xyz[1]
-                        dz = aj.xyz[2] - ai.xyz[2]
-                        dd = dx*dx + dy*dy + dz*dz
-                        t = ai.r + aj.r + 0.4
-                        if dd > 0.8 and dd < t*t:
-                            bcon.append([i+tot,j+k+tot])
-                tot += len(systmp)
-        return bcon
+        systmp = [at for mol in system for at in mol]
+        if len(systmp) <= 1: return []
+        xyz = np.array([at.xyz for at in systmp],dtype=float)
+        rad = np.array([at.r for at in systmp],dtype=float)
+        mol = np.repeat(np.arange(len(system)),[len(m) for m in system])
+        # atoms with not-a-number coordinates never bond
+        ndx = np.where(np.isfinite(xyz).all(axis=1))[0]
+        if len(ndx) <= 1: return []
+        cut = 2.0 * rad[ndx].max() + 0.4
+        cells = np.floor((xyz[ndx]-xyz[ndx].min(axis=0))/cut).astype(np.int64)
+        # pad one cell on each side, neighbor keys never wrap around
+        dims = cells.max(axis=0) + 3
+        keys = ((cells[:,0]+1)*dims[1] + cells[:,1]+1)*dims[2] + cells[:,2]+1
+        # separate grid for each molecule
+        if not boall: keys += mol[ndx] * dims.prod()
+        order = np.argsort(keys,kind='stable')
+        skeys = keys[order]
+
+        ilist = []
+        jlist = []
+        for dx,dy,dz in itertools.product((-1,0,1),repeat=3):
+            nkeys = keys + (dx*dims[1] + dy)*dims[2] + dz
+            beg = np.searchsorted(skeys,nkeys,side='left')
+            cnt = np.searchsorted(skeys,nkeys,side='right') - beg
+            tot = cnt.sum()
+            if tot == 0: continue
+            offs = np.arange(tot) - np.repeat(np.cumsum(cnt)-cnt,cnt)
+            ilist.append(np.repeat(ndx,cnt))
+            jlist.append(ndx[order[np.repeat(beg,cnt)+offs]])
+        if not ilist: return []
+        i = np.concatenate(ilist)
+        j = np.concatenate(jlist)
+        bo = i < j
+        if not boall: bo &= mol[i] == mol[j]
+        i = i[bo]
+        j = j[bo]
+
+        d = xyz[j] - xyz[i]
+        dd = d[:,0]*d[:,0] + d[:,1]*d[:,1] + d[:,2]*d[:,2]
+        t = rad[i] + rad[j] + 0.4
+        bo = (dd > 0.8) & (dd < t*t)
+        i = i[bo]
+        j = j[bo]
+        srt = np.lexsort((j,i))
+        return np.stack([i[srt],j[srt]],axis=1).tolist()
+
+
+
+    @property
+    def reflist(self):
+        return self.calc_reflist(self.system,self.bcon)
 
 
 
     def calc_reflist(self,system,bcon):
         # split total index to individual index
         # corresponding to hard-coded info
-        tmplist = [len(i) for i in system]
-        acclist = [0,]
-        tot = 0
-        for i in tmplist:
-            tot += i
-            acclist.append(tot)
-        reflist = []
-        for ndx in bcon:
-            for i,nm in enumerate(acclist):
-                if ndx[0] < nm:
-                    mi = i - 1
-                    ai = ndx[0] - acclist[i-1]
-                    break
-            for i,nm in enumerate(acclist):
-                if ndx[1] < nm:
-                    mj = i - 1
-                    aj = ndx[1] - acclist[i-1]
-                    break
-            if len(ndx) == 2:
-                reflist.append([mi,ai,mj,aj,0.0])
-            else:
-                reflist.append([mi,ai,mj,aj,ndx[2]])
+        if len(bcon) == 0: return []
+        acclist = np.cumsum([0,]+[len(i) for i in system])
+        if isinstance(bcon,np.ndarray):
+            pairs = bcon[:,:2].astype(int)
+            corr = bcon[:,2].tolist() if bcon.shape[1] > 2 else [0.0 for i in range(len(bcon))]
+        else:
+            pairs = np.array([ndx[:2] for ndx in bcon],dtype=int)
+            corr = [0.0 if len(ndx) == 2 else ndx[2] for ndx in bcon]
+        # molecule index, first accumulation larger than atom index
+        mols = np.searchsorted(acclist,pairs,side='right') - 1
+        atoms = pairs - acclist[mols]
+        reflist = [[mi,ai,mj,aj,c] for (mi,mj),(ai,aj),c in zip(mols.tolist(),atoms.tolist(),corr)]
         return reflist
 
 
 
+    def calc_frames(self,sysnew):
+        """
+        Return:
+            frames : 3D num*nAtom*3f : numpy array
+        """
+        if isinstance(sysnew,SystemFrames): return sysnew.frames
+        frames = [[at.xyz for mol in system for at in mol] for system in sysnew]
+        natoms = sum([len(i) for i in self.system])
+        return np.array(frames,dtype=float).reshape(-1,natoms,3)
+
+
+
+    def calc_pair_mask(self,frames,pairs,lower=None,upper=None,chunk=None):
+        """batched validation on all generations
+
+        Args:
+            frames : 3D num*nAtom*3f
+            pairs  : 2D n*2i : [[atom-i, atom-j], ...], counted as whole system
+            lower  : float | 1D nf : squared distance, keep when all dd >= lower
+            upper  : float | 1D nf : squared distance, keep when all dd <= upper
+            chunk (int): number of generations calculated at once,
+                         default, generations * pairs is about 1000000
+
+        Return:
+            keep : 1D num : numpy bool array
+        """
+        pairs = np.array(pairs,dtype=int).reshape(-1,2)
+        if chunk is None: chunk = max(1000000//max(len(pairs),1),1)
+        keep = np.ones(len(frames),dtype=bool)
+        for beg in range(0,len(frames),chunk):
+            sub = frames[beg:beg+chunk]
+            # gather on contiguous axis, one dimension each time
+            dd = None
+            for k in range(3):
+                x = np.ascontiguousarray(sub[:,:,k])
+                d = x.take(pairs[:,1],axis=1) - x.take(pairs[:,0],axis=1)
+                d *= d
+                dd = d if dd is None else dd + d
+            bo = np.ones(len(sub),dtype=bool)
+            if lower is not None: bo &= np.all(dd >= lower,axis=1)
+            if upper is not None: bo &= np.all(dd <= upper,axis=1)
+            keep[beg:beg+chunk] = bo
+        return keep
+
+
+
+    def calc_filter(self,keep):
+        """update self.sysnew on keep mask"""
+        if isinstance(self.sysnew,SystemFrames):
+            self.sysnew = self.sysnew.take(np.nonzero(keep)[0])
+        else:
+            self.sysnew = [system for bo,system in zip(keep,self.sysnew) if bo]
+        self.num = len(self.sysnew)
+
+
+
     def run(self):
         if len(self.bcon) == 0:
             print('Warning: no filtration: bcon is empty')
             return
 
-        self.reflist = self.calc_reflist(self.system,self.bcon)
-
-        sysrst = []
-        for system in self.sysnew:
-            bo = True
-            for ndx in self.reflist:
-                ai = system[ndx[0]][ndx[1]]
-                aj = system[ndx[2]][ndx[3]]
-                dx = aj.xyz[0] - ai.xyz[0]
-                dy = aj.xyz[1] - ai.xyz[1]
-                dz = aj.xyz[2] - ai.xyz[2]
-                dd = dx*dx + dy*dy + dz*dz
-                t = ai.r + aj.r + 0.4 + ndx[4]
-                if dd < 0.64 or dd > t*t:
-                    bo = False
-                    break
-            if bo:
-                sysrst.append(system)
-        self.num = len(sysrst)
-        self.sysnew = sysrst
+        # 0.8 <= dij <= ri + rj + 0.4 + correctness
+        radius = [at.r for mol in self.system for at in mol]
+        t = [radius[ndx[0]] + radius[ndx[1]] + 0.4 + (ndx[2] if len(ndx) > 2 else 0.0) for ndx in self.bcon]
+        t = np.array(t)
+        pairs = [ndx[:2] for ndx in self.bcon]
+        keep = self.calc_pair_mask(self.calc_frames(self.sysnew),pairs,lower=0.64,upper=t*t)
+        self.calc_filter(keep)
 
 
 
@@ -2972,8 +3421,45 @@ def test_class_FixBonds():
         print(fb.info)
         exit()
     print(fb.bcon,fb.bmode,fb.filters)
+    sysnew = fv.sysnew
     fb.run()
 
+    # same as pair-wise checking
+    ref = []
+    for system in sysnew:
+        bo = True
+        for ndx in fb.reflist:
+            ai = system[ndx[0]][ndx[1]]
+            aj = system[ndx[2]][ndx[3]]
+            dd = sum([(aj.xyz[i]-ai.xyz[i])**2 for i in range(3)])
+            t = ai.r + aj.r + 0.4 + ndx[4]
+            if dd < 0.64 or dd > t*t: bo = False
+        if bo: ref.append([at.xyz for mol in system for at in mol])
+    assert fb.num == len(ref)
+    assert np.allclose(fb.sysnew.frames, np.array(ref).reshape(-1,13,3))
+
+    # cell-list bond perception is same as pair-wise checking
+    rng = np.random.default_rng(7)
+    cluster = [[FAI.get_atom(str(rng.choice(['C','H','O','N'])),
+                             xyz=rng.uniform(0.0,12.0,3).tolist())
+                for j in range(6)] for i in range(40)]
+    for boall in [True,False]:
+        ref = []
+        tot = 0
+        for mol in cluster:
+            cnt = len(mol)
+            mol = [at for m in cluster for at in m] if boall else mol
+            for i,ai in enumerate(mol):
+                for j in range(i+1,len(mol)):
+                    aj = mol[j]
+                    dd = sum([(aj.xyz[k]-ai.xyz[k])**2 for k in range(3)])
+                    t = ai.r + aj.r + 0.4
+                    if dd > 0.8 and dd < t*t:
+                        ref.append([i,j] if boall else [i+tot,j+tot])
+            if boall: break
+            tot += cnt
+        assert fb.calc_bond_perception(cluster,boall=boall) == ref
+
     print(len(fb.sysnew))
     for i in range(min(len(fb.sysnew),2)):
         for mol in fb.sysnew[i]:
@@ -2985,12 +3471,38 @@ def test_class_FixBonds():
 
 
 
+@functools.lru_cache(maxsize=8)
+def calc_nonbonds_cached(tot,bonds):
+    """nonbonded pairs on topology, bounded cache for FixNonBonds
+
+    Args:
+        tot (int) : number of atoms
+        bonds     : tuple of sorted (i,j), bonded pairs
+
+    Return:
+        nbcon : 2D n*2i : read-only numpy array, pairs [i,j] (i < j) not in bonds
+    """
+    bonded = np.zeros((tot,tot),dtype=bool)
+    for ndx in bonds: bonded[ndx[0],ndx[1]] = True
+    i,j = np.triu_indices(tot,k=1)
+    bo = ~bonded[i,j]
+    nbcon = np.stack([i[bo],j[bo]],axis=1)
+    nbcon.flags.writeable = False
+    return nbcon
+
+
+
 class FixNonBonds(FixBonds):
     """
     Args:
         nbcon : 2D n*2i : nonbonded index list, performed filtration on
+                default, all pairs [i,j] (i < j) not in bcon, numpy array
 
         sysnew will be updated filtered results after self.run() is executed
+
+    Note:
+        default nbcon is cached on recent reference topologies, (number of atoms,
+        bcon), it is shared and read-only, make a copy before any modification
     """
     def __init__(self,system,*args,covalent=None,**kwargs):
         super().__init__(system,*args,**kwargs)
@@ -2998,16 +3510,7 @@ class FixNonBonds(FixBonds):
         nbcon = kwargs['nbcon'] if 'nbcon' in kwargs else None
         if nbcon is None:
             tot = sum([len(i) for i in self.system])
-            self.nbcon = []
-            for i in range(tot-1):
-                for j in range(i+1,tot):
-                    bo = False
-                    for ndx in self.bcon:
-                        if ndx[0] == i and ndx[1] == j:
-                            bo = True
-                            break
-                    if not bo:
-                        self.nbcon.append([i,j])
+            self.nbcon = self.calc_nonbonds(tot,self.bcon)
         elif self.userinputs:
             self.nbcon = self.check_user_inputs(nbcon)
             if not self.nice: return
@@ -3018,31 +3521,31 @@ class FixNonBonds(FixBonds):
 
 
 
+    @property
+    def reflist(self):
+        return self.calc_reflist(self.system,self.nbcon)
+
+
+
+    def calc_nonbonds(self,tot,bcon):
+        """
+        Return:
+            nbcon : 2D n*2i : numpy array, pairs [i,j] (i < j) not in bcon
+        """
+        bonds = tuple(sorted(set([(ndx[0],ndx[1]) for ndx in bcon])))
+        return calc_nonbonds_cached(tot,bonds)
+
+
+
     def run(self):
         if len(self.nbcon) == 0:
             print('Warning: no filtration: nbcon is empty')
             return
 
-        self.reflist = self.calc_reflist(self.system,self.nbcon)
-
-        sysrst = []
         hh = 0.74*0.74 if self.covalent is None else self.covalent*self.covalent
-        for system in self.sysnew:
-            bo = True
-            for ndx in self.reflist:
-                ai = system[ndx[0]][ndx[1]]
-                aj = system[ndx[2]][ndx[3]]
-                dx = aj.xyz[0] - ai.xyz[0]
-                dy = aj.xyz[1] - ai.xyz[1]
-                dz = aj.xyz[2] - ai.xyz[2]
-                dd = dx*dx + dy*dy + dz*dz
-                if dd < hh:
-                    bo = False
-                    break
-            if bo:
-                sysrst.append(system)
-        self.num = len(sysrst)
-        self.sysnew = sysrst
+        pairs = [ndx[:2] for ndx in self.nbcon]
+        keep = self.calc_pair_mask(self.calc_frames(self.sysnew),pairs,lower=hh)
+        self.calc_filter(keep)
 
 
 
@@ -3079,6 +3582,10 @@ def test_class_FixNonbonds():
     print(fv.num)
     fnb = FixNonBonds(system,bcon=[[1,7]],sysnew=fv.sysnew)
     assert fnb.nice
+    # nbcon is cached for the same topology
+    assert len(fnb.nbcon) == 10*9//2 - 1
+    assert [1,7] not in fnb.nbcon.tolist()
+    assert FixNonBonds(system,bcon=[[1,7]],sysnew=fv.sysnew).nbcon is fnb.nbcon
     print('bcon =',fnb.bcon)
     print('nbcon=',fnb.nbcon)
     fnb.run()
@@ -3087,6 +3594,129 @@ def test_class_FixNonbonds():
 
 
 
+class ParSets(collections.abc.Sequence):
+    """lazy bond variation parameter sets, rebuilt on deterministic index
+
+    Args:
+        pids (2D n*2i) : [mol-index, atom-index] for each atom, in order
+        mode (str)     : dual | single
+        nm (int)       : number of varied points
+        inc (float)    : increment, default 0.03
+
+    Note:
+        order is same as nested loops of:
+            for i,j (i != j) --> combination of the rest atoms (size r)
+                             --> ratio, [3, 0.3] for dual, [3] for single
+
+        dual   : nm = r + 1 : idpts = [aj, *combination]
+        single : nm = r     : idpts = combination
+
+        so, self[cnt] is calculated from cnt, no sets are kept in memory
+    """
+    def __init__(self,pids,mode,nm,inc=None):
+        self.pids = pids
+        self.mode = mode
+        self.nm = nm
+        self.inc = 0.03 if inc is None else inc
+        n = len(pids)
+        self.r = nm - 1 if mode == 'dual' else nm
+        self.ratios = [3, 0.3] if mode == 'dual' else [3, ]
+        self.per = math.comb(n-2,self.r) * len(self.ratios) if n >= 2 else 0
+        self.size = n * (n-1) * self.per
+
+
+    def __len__(self):
+        return self.size
+
+
+    def __getitem__(self,cnt):
+        if isinstance(cnt,slice):
+            return [self[i] for i in range(*cnt.indices(self.size))]
+        if cnt < 0: cnt += self.size
+        if cnt < 0 or cnt >= self.size:
+            raise IndexError('ParSets index out of range')
+        n = len(self.pids)
+        q,rest = divmod(cnt,self.per)
+        i,j = divmod(q,n-1)
+        if j >= i: j += 1
+        k,t = divmod(rest,len(self.ratios))
+        ml = [p for p in range(n) if p != i and p != j]
+        return self.calc_par(i,j,self.calc_combination(ml,self.r,k),self.ratios[t])
+
+
+    def __iter__(self):
+        n = len(self.pids)
+        for i in range(n):
+            for j in range(n):
+                if j == i: continue
+                ml = [p for p in range(n) if p != i and p != j]
+                for cl in itertools.combinations(ml,self.r):
+                    for ratio in self.ratios:
+                        yield self.calc_par(i,j,cl,ratio)
+
+
+    def calc_par(self,i,j,cl,ratio):
+        idpts = [list(self.pids[p]) for p in cl]
+        if self.mode == 'dual': idpts.insert(0,list(self.pids[j]))
+        return {
+            'idpo': list(self.pids[i]),
+            'idpd': list(self.pids[j]),
+            'idpts': idpts,
+            'inc': self.inc,
+            'ratio': ratio,
+        }
+
+
+    def calc_combination(self,ml,r,k):
+        """k-th combination of ml in size r, lexicographic order"""
+        cl = []
+        beg = 0
+        for left in range(r,0,-1):
+            for p in range(beg,len(ml)):
+                c = math.comb(len(ml)-p-1,left-1)
+                if k < c:
+                    cl.append(ml[p])
+                    beg = p + 1
+                    break
+                k -= c
+        return cl
+
+
+
+def test_class_ParSets():
+    n = 6
+    pids = [[0,i] for i in range(3)] + [[1,i] for i in range(3)]
+    dual = [ParSets(pids,'dual',p) for p in range(1,n-1)]
+    single = [ParSets(pids,'single',p) for p in range(1,n-1)]
+    assert sum([len(i) for i in dual]) == func_vb(n)[0]
+    assert sum([len(i) for i in single]) == func_vb(n)[1]
+
+    # eager building
+    ref = {'dual':{p:[] for p in range(1,n-1)}, 'single':{p:[] for p in range(1,n-1)}}
+    for i in range(n):
+        for j in range(n):
+            if j == i: continue
+            ref['dual'][1].append([i,j,[j],3])
+            ref['dual'][1].append([i,j,[j],0.3])
+            s = [k for k in range(n) if k != i and k != j]
+            for r in range(1,n-1):
+                for ndx in itertools.combinations(s,r):
+                    if r != n - 2:
+                        ref['dual'][r+1].append([i,j,[j,*ndx],3])
+                        ref['dual'][r+1].append([i,j,[j,*ndx],0.3])
+                    ref['single'][r].append([i,j,list(ndx),3])
+
+    for mode,pars in [('dual',dual),('single',single)]:
+        for ps in pars:
+            got = [[pids.index(kw['idpo']),pids.index(kw['idpd']),
+                    [pids.index(p) for p in kw['idpts']],kw['ratio']] for kw in ps]
+            assert got == ref[mode][ps.nm]
+            # rebuilt by index
+            assert [ps[cnt] for cnt in range(len(ps))] == list(ps)
+            assert ps[-1] == ps[len(ps)-1]
+
+
+
 class GenCheck:
     """check generation parameters
 
@@ -3110,7 +3740,8 @@ class GenCheck:
             diffpd  | dd
     """
     def __init__(self,*args,userinputs=None,gmode=None,gaims=None,pmode=None,
-                po=None,pd=None,pt=None,pr=None,idpts=None,**kwargs):
+                po=None,pd=None,pt=None,pr=None,ipo=None,ipd=None,ipt=None,ipr=None,
+                idpts=None,**kwargs):
         self.nice = True
         self.info = ''
 
@@ -3162,10 +3793,14 @@ class GenCheck:
         if idpts is None: self.gmode = 'all'
         
         tmp = False if userinputs is False else True
-        self.ipo = None if ipo is None else [ipo[0]-tmp,ipo[1]-tmp]
-        self.ipd = None if ipd is None else [ipd[0]-tmp,ipd[1]-tmp]
-        self.ipt = None if ipt is None else [ipt[0]-tmp,ipt[1]-tmp]
-        self.ipr = None if ipr is None else [ipr[0]-tmp,ipr[1]-tmp]
+        def shift(pi):
+            if pi is None: return None
+            if isinstance(pi,int): return pi - tmp
+            return [pi[0]-tmp,pi[1]-tmp]
+        self.ipo = shift(ipo)
+        self.ipd = shift(ipd)
+        self.ipt = shift(ipt)
+        self.ipr = shift(ipr)
 
         if gaims is not None and isinstance(gaims,int):
             self.nice = False
@@ -3198,33 +3833,62 @@ class GenCheck:
 
 
 
-class GenBonds(VaryBond,FixNonBonds):
-    def __init__(self,system,*args,**kwargs):
-        # make sure initialization work
-        bopts = True if 'pts' in kwargs and kwargs['pts'] is not None else False
-        boipts = True if 'ipts' in kwargs and kwargs['ipts'] is not None else False
-        boidpts = True if 'idpts' in kwargs and kwargs['idpts'] is not None else False
-        if not bopts and not boipts and not boidpts:
-            kwargs['idpts'] = [[0,0]]
-        VaryBond.__init__(self,system,*args,**kwargs)
-        if not self.nice: return
+# generator shared with pool workers, inherited on fork
+_GENPOOL = None
 
-        # be aware in here, system is added an additional dimension
-        FixNonBonds.__init__(self,[system],**self.kwargs)
-        if not self.nice: return
 
-        if not boipts and not boidpts:
-            kwargs['idpts'] = None
-        else:
-            kwargs['idpts'] = self.idpts
+def init_genbonds_worker(gen):
+    global _GENPOOL
+    _GENPOOL = gen
 
-        GenCheck.__init__(self,**kwargs)
 
+def calc_genbonds_task(key):
+    return key, _GENPOOL.calc_task(key)
 
 
+def calc_genbonds_tasks(gen,keys,nproc=None,chunk=None):
+    """run gen.calc_task on each key, serial or on a process pool
+
+    Args:
+        gen  : GenBonds | MyGenBonds | MyGenBondsSurroundingSampling
+        keys : iterable of task keys, parameter set is rebuilt from key
+        nproc (int): number of processes, default 1
+        chunk (int): number of tasks dispatched each time, default 8
+
+    Yield:
+        (key, sysnew) : in the same order as keys
+
+    Note:
+        reference system is shared with workers by fork when it is available,
+        otherwise gen is pickled once for each worker
+    """
+    nproc = 1 if nproc is None else max(nproc,1)
+    chunk = 8 if chunk is None else max(chunk,1)
+    if nproc == 1:
+        for key in keys:
+            yield key, gen.calc_task(key)
+        return
+    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    ctx = multiprocessing.get_context(method)
+    with ctx.Pool(nproc,initializer=init_genbonds_worker,initargs=(gen,)) as pool:
+        for key,sysnew in pool.imap(calc_genbonds_task,keys,chunksize=chunk):
+            yield key, sysnew
+
+
+
+
+
+class GenBondsBase(VaryBond,FixNonBonds):
+    """shared parameter sets & execution for GenBonds and MyGenBonds
+
+    Note:
+        this is not used directly, subclasses have to set self.kwargs and
+        self.idpts, then call self.calc_pars() in their initialization
+    """
     def calc_pars(self):
         # format:
-        #       dual|single     vary-num-pts     [kwargs, kwargs ...]
+        #       dual|single     vary-num-pts     ParSets: [kwargs, kwargs ...]
+        # sets are lazy, self.totpars[dual|single][nm][cnt] is built on index
         n = sum([len(i) for i in self.system])
         self.totpars = {'dual':{}, 'single':{}}
         self.totnews = {'dual':{}, 'single':{}}
@@ -3239,108 +3903,66 @@ class GenBonds(VaryBond,FixNonBonds):
             bopo = True if 'po' in self.kwargs and self.kwargs['po'] is not None else False
             bopd = True if 'pd' in self.kwargs and self.kwargs['pd'] is not None else False
             if (not bopo) and (not bopd):
-                for i in range(n):
-                    for j in range(n):
-                        if j == i: continue
-
-                        ai = self.calc_pid(i)
-                        aj = self.calc_pid(j)
-
-                        # only direction point
-                        # be aware, idpts should be in 2D
-                        self.totpars['dual'][1].append(
-                            {
-                                'idpo': ai,
-                                'idpd': aj,
-                                'idpts': [aj],
-                                'inc': 0.03,
-                                'ratio': 3,
-                            }
-                        )
-                        self.totpars['dual'][1].append(
-                            {
-                                'idpo': ai,
-                                'idpd': aj,
-                                'idpts': [aj],
-                                'inc': 0.03,
-                                'ratio': 0.3,
-                            }
-                    )
-
-                        s = [k for k in range(n) if k != i and k != j]
-                        for r in range(1,n-1):
-                            for ndx in itertools.combinations(s,r):
-                                mm = self.calc_indexs(ndx)
-                                if r != n - 2:
-                                    # Care! shallow copy of aj
-                                    mm_with_aj = [aj, ]
-                                    mm_with_aj.extend(mm)
-
-                                    # dual when contains direction point
-                                    self.totpars['dual'][r+1].append(
-                                        {
-                                            'idpo': ai,
-                                            'idpd': aj,
-                                            'idpts': mm_with_aj,
-                                            'inc': 0.03,
-                                            'ratio': 3,
-                                        }
-                                    )
-                                    self.totpars['dual'][r+1].append(
-                                        {
-                                            'idpo': ai,
-                                            'idpd': aj,
-                                            'idpts': mm_with_aj,
-                                            'inc': 0.03,
-                                            'ratio': 0.3,
-                                        }
-                                    )
-
-                                # single when no direction point
-                                self.totpars['single'][r].append(
-                                    {
-                                        'idpo': ai,
-                                        'idpd': aj,
-                                        'idpts': mm,
-                                        'inc': 0.03,
-                                        'ratio': 3,
-                                    }
-                                )
+                pids = self.calc_pid(list(range(n)))
+                for p in range(1,n-1):
+                    self.totpars['dual'][p] = ParSets(pids,'dual',p)
+                    self.totpars['single'][p] = ParSets(pids,'single',p)
 
 
 
-    def run(self):
-        pars = self.totpars['dual']
-        for nm in pars:
-            for p in pars[nm]:
-                VaryBond.__init__(self,self.system,**p)
-                VaryBond.run(self)
+    def calc_keys(self):
+        for mode in ['dual','single']:
+            for nm in self.totpars[mode]:
+                for cnt in range(len(self.totpars[mode][nm])):
+                    yield (mode,nm,cnt)
+
+
+
+    def calc_kw(self,key):
+        mode,nm,cnt = key
+        return self.totpars[mode][nm][cnt]
+
 
-                if self.bcon is not None and len(self.bcon) != 0:
-                    FixBonds.run(self)
-                if self.nbcon is not None and len(self.nbcon) != 0:
-                    FixNonBonds.run(self)
 
-                self.totnews['dual'][nm].append(self.sysnew)
+    def calc_task(self,key):
+        VaryBond.__init__(self,self.system,**self.calc_kw(key))
+        VaryBond.run(self)
 
-        pars = self.totpars['single']
-        for nm in pars:
-            for p in pars[nm]:
-                VaryBond.__init__(self,self.system,**p)
-                VaryBond.run(self)
+        if self.bcon is not None and len(self.bcon) != 0:
+            FixBonds.run(self)
+        if self.nbcon is not None and len(self.nbcon) != 0:
+            FixNonBonds.run(self)
+        return self.sysnew
 
-                if self.bcon is not None and len(self.bcon) != 0:
-                    FixBonds.run(self)
-                if self.nbcon is not None and len(self.nbcon) != 0:
-                    FixNonBonds.run(self)
 
-                self.totnews['single'][nm].append(self.sysnew)
+
+    def run(self,sink=None,nproc=None,chunk=None):
+        """
+        Args:
+            sink (callable) : sink(key,kw,sysnew), streaming results,
+                              key = (dual|single, nm, cnt)
+                              kw  = self.totpars[dual|single][nm][cnt]
+                              default, results are kept in self.totnews
+            nproc (int)     : number of processes, default 1
+            chunk (int)     : number of parameter sets dispatched each time
+
+        Note:
+            results are always in order of parameter sets
+        """
+        tasks = calc_genbonds_tasks(self,self.calc_keys(),nproc=nproc,chunk=chunk)
+        for key,sysnew in tasks:
+            self.sysnew = sysnew
+            if sink is None:
+                mode,nm,cnt = key
+                self.totnews[mode][nm].append(sysnew)
+            else:
+                sink(key,self.calc_kw(key),sysnew)
 
 
 
 
 
-class MyGenBonds(VaryBond,FixNonBonds):
+class GenBonds(GenBondsBase):
     def __init__(self,system,*args,**kwargs):
         self.kwargs = kwargs
         # make sure initialization work
@@ -3353,132 +3975,47 @@ class MyGenBonds(VaryBond,FixNonBonds):
         if not self.nice: return
 
         # be aware in here, system is added an additional dimension
-        FixNonBonds.__init__(self,[system],**kwargs)
+        FixNonBonds.__init__(self,[system],**self.kwargs)
         if not self.nice: return
 
         if not boipts and not boidpts:
             kwargs['idpts'] = None
-            self.idpts = []
-            self.calc_pars()
         else:
             kwargs['idpts'] = self.idpts
 
+        GenCheck.__init__(self,**kwargs)
+        if not self.nice: return
 
-    def calc_pars(self):
-        # format:
-        #       dual|single     vary-num-pts     [kwargs, kwargs ...]
-        n = sum([len(i) for i in self.system])
-        self.totpars = {'dual':{}, 'single':{}}
-        self.totnews = {'dual':{}, 'single':{}}
-        for p in range(1,n-1):
-            self.totpars['dual'][p] = []
-            self.totpars['single'][p] = []
-
-            self.totnews['dual'][p] = []
-            self.totnews['single'][p] = []
-        
-
-        if self.idpts is None or len(self.idpts) == 0:
-            bopo = True if 'po' in self.kwargs and self.kwargs['po'] is not None else False
-            bopd = True if 'pd' in self.kwargs and self.kwargs['pd'] is not None else False
-            if (not bopo) and (not bopd):
-                for i in range(n):
-                    for j in range(n):
-                        if j == i: continue
-
-                        ai = self.calc_pid(i)
-                        aj = self.calc_pid(j)
-
-                        # only direction point
-                        # be aware, idpts should be in 2D
-                        self.totpars['dual'][1].append(
-                            {
-                                'idpo': ai,
-                                'idpd': aj,
-                                'idpts': [aj],
-                                'inc': 0.03,
-                                'ratio': 3,
-                            }
-                        )
-                        self.totpars['dual'][1].append(
-                            {
-                                'idpo': ai,
-                                'idpd': aj,
-                                'idpts': [aj],
-                                'inc': 0.03,
-                                'ratio': 0.3,
-                            }
-                    )
-
-                        s = [k for k in range(n) if k != i and k != j]
-                        for r in range(1,n-1):
-                            for ndx in itertools.combinations(s,r):
-                                mm = self.calc_pid(ndx)
-                                if r != n - 2:
-                                    # Care! shallow copy of aj
-                                    mm_with_aj = [aj, ]
-                                    mm_with_aj.extend(mm)
-
-                                    # dual when contains direction point
-                                    self.totpars['dual'][r+1].append(
-                                        {
-                                            'idpo': ai,
-                                            'idpd': aj,
-                                            'idpts': mm_with_aj,
-                                            'inc': 0.03,
-                                            'ratio': 3,
-                                        }
-                                    )
-                                    self.totpars['dual'][r+1].append(
-                                        {
-                                            'idpo': ai,
-                                            'idpd': aj,
-                                            'idpts': mm_with_aj,
-                                            'inc': 0.03,
-                                            'ratio': 0.3,
-                                        }
-                                    )
-
-                                # single when no direction point
-                                self.totpars['single'][r].append(
-                                    {
-                                        'idpo': ai,
-                                        'idpd': aj,
-                                        'idpts': mm,
-                                        'inc': 0.03,
-                                        'ratio': 3,
-                                    }
-                                )
-
-
+        if not boipts and not boidpts:
+            self.idpts = []
+            self.calc_pars()
 
-    def run(self):
-        pars = self.totpars['dual']
-        for nm in pars:
-            for p in pars[nm]:
-                VaryBond.__init__(self,self.system,**p)
-                VaryBond.run(self)
 
-                if self.bcon is not None and len(self.bcon) != 0:
-                    FixBonds.run(self)
-                if self.nbcon is not None and len(self.nbcon) != 0:
-                    FixNonBonds.run(self)
 
-                self.totnews['dual'][nm].append(self.sysnew)
 
-        pars = self.totpars['single']
-        for nm in pars:
-            for p in pars[nm]:
-                VaryBond.__init__(self,self.system,**p)
-                VaryBond.run(self)
 
-                if self.bcon is not None and len(self.bcon) != 0:
-                    FixBonds.run(self)
-                if self.nbcon is not None and len(self.nbcon) != 0:
-                    FixNonBonds.run(self)
+class MyGenBonds(GenBondsBase):
+    def __init__(self,system,*args,**kwargs):
+        self.kwargs = kwargs
+        # make sure initialization work
+        bopts = True if 'pts' in kwargs and kwargs['pts'] is not None else False
+        boipts = True if 'ipts' in kwargs and kwargs['ipts'] is not None else False
+        boidpts = True if 'idpts' in kwargs and kwargs['idpts'] is not None else False
+        if not bopts and not boipts and not boidpts:
+            kwargs['idpts'] = [[0,0]]
+        VaryBond.__init__(self,system,*args,**kwargs)
+        if not self.nice: return
 
-                self.totnews['single'][nm].append(self.sysnew)
+        # be aware in here, system is added an additional dimension
+        FixNonBonds.__init__(self,[system],**kwargs)
+        if not self.nice: return
 
+        if not boipts and not boidpts:
+            kwargs['idpts'] = None
+            self.idpts = []
+            self.calc_pars()
+        else:
+            kwargs['idpts'] = self.idpts
 
 
 
@@ -3507,10 +4044,21 @@ def test_class_GenBonds():
     system = ai.guess_atoms_for_system(RF.system)
 
     GB = GenBonds(system)
-    GB.run()
     if not GB.nice:
         print(GB.info)
         return
+    GB.run()
+
+    # streaming results are same as kept ones
+    got = []
+    GB.run(sink=lambda key,kw,sysnew: got.append([key,len(sysnew)]))
+    ref = [[(mode,nm,cnt),len(sysnew)] for mode in ['dual','single']
+           for nm in GB.totnews[mode] for cnt,sysnew in enumerate(GB.totnews[mode][nm])]
+    assert got == ref
+    assert len(got) == func_vb(sum([len(i) for i in system]))[2]
+    got = []
+    GB.run(sink=lambda key,kw,sysnew: got.append([key,len(sysnew)]),nproc=2,chunk=5)
+    assert got == ref
 
     pars = GB.totpars['dual']
     news = GB.totnews['dual']
@@ -3534,6 +4082,34 @@ def test_class_GenBonds():
 
 
 
+def test_class_MyGenBonds():
+    system = [[FAI.get_atom(s='C',xyz=[0.000,0.000,0.000]),
+               FAI.get_atom(s='Cl',xyz=[2.315,0.000,0.000])],
+              [FAI.get_atom(s='H',xyz=[-0.002,-0.611,0.899]),
+               FAI.get_atom(s='H',xyz=[-0.002,-0.473,-0.978])]]
+
+    GB = MyGenBonds(system)
+    if not GB.nice:
+        print(GB.info)
+        return
+    GB.run()
+
+    # parallel results are same and in same order
+    got = []
+    GB.run(sink=lambda key,kw,sysnew: got.append([key,kw,sysnew]),nproc=2,chunk=3)
+    cnt = 0
+    for mode in ['dual','single']:
+        for nm in GB.totpars[mode]:
+            for i,kw in enumerate(GB.totpars[mode][nm]):
+                assert got[cnt][:2] == [(mode,nm,i),kw]
+                ref = GB.calc_frames(GB.totnews[mode][nm][i])
+                assert np.array_equal(GB.calc_frames(got[cnt][2]),ref)
+                cnt += 1
+    assert cnt == len(got)
+    print('number of parameter sets ==>',cnt)
+
+
+
 class SaveFileSystemSingle:
     """opposite operation to ReadFile
 
@@ -4091,6 +4667,11 @@ class MyGenBondsSurroundingSampling(MyGenBonds):
         atomnums = sum([len(i) for i in self.system])
         self.gc = [i/atomnums for i in self.gc]
         self.vbrotate = 60
+        num = int(360.0/self.vbrotate + 0.5)
+        angles = self.vbrotate * np.arange(1,num)
+        base = self.calc_coords()
+        # shared atomic table
+        ref = SystemFrames(self.system)
 
         for iref in range(atomnums):
             self.refsys[iref] = {}
@@ -4128,29 +4709,13 @@ class MyGenBondsSurroundingSampling(MyGenBonds):
                 # starting point
                 sp = func_shell(atref,self.gc,ataim,inc=self.inc)
 
-                # make deep copy of system
-                stm = [[FAI.copy_atom(at) for at in mol] for mol in self.system]
-
-                # update target atom coordinates
-                stm[ndxatom[0]][ndxatom[1]].xyz = sp
-
-                news = [stm, ]
-
-                num = int(360.0/self.vbrotate + 0.5)
-                for cnt in range(1,num):
-                    rat = rotation(atref,ataim,angle=self.vbrotate*cnt)
+                # target atom on starting point, then all its rotations
+                mats = rotation_batch(atref,ataim,angles=angles)
+                frames = np.repeat(base[np.newaxis,:,:],num,axis=0)
+                frames[0,iatom,:] = sp
+                frames[1:,iatom,:] = rotation_apply(mats,sp)[:,0,:]
 
-                    x = rat[0][0]*sp[0] + rat[0][1]*sp[1] + rat[0][2]*sp[2] + rat[0][3]
-                    y = rat[1][0]*sp[0] + rat[1][1]*sp[1] + rat[1][2]*sp[2] + rat[1][3]
-                    z = rat[2][0]*sp[0] + rat[2][1]*sp[1] + rat[2][2]*sp[2] + rat[2][3]
-
-                    # make deep copy of system
-                    stm = [[FAI.copy_atom(at) for at in mol] for mol in self.system]
-                    stm[ndxatom[0]][ndxatom[1]].xyz = [x,y,z]
-
-                    news.append(stm)
-                
-                self.refsys[iref][iatom] = news
+                self.refsys[iref][iatom] = SystemFrames(ref,frames)
         
         # generate corresponding pars
         # format: {iref: iatom:     vary-num-pts: [kwargs, kwargs ...]}
@@ -4192,44 +4757,70 @@ class MyGenBondsSurroundingSampling(MyGenBonds):
                         self.overall_pars[iref][iatom][npts+1].append(parmore)
                         self.overall_pars[iref][iatom][npts+1].append(parless)
 
-    def run(self):
-        # self.refsys & self.totpars
-        self.totsysnews = {}
-        # key format:
-        #   iref-iatom-vbrotate+times-varyatnums-more/less-target+target+target
+    def calc_keys(self):
         for iref in self.refsys:
             for iatom in self.refsys[iref]:
                 if len(self.refsys[iref][iatom]) == 0: continue
+                for times in range(len(self.refsys[iref][iatom])):
+                    for npts in self.overall_pars[iref][iatom]:
+                        for cnt in range(len(self.overall_pars[iref][iatom][npts])):
+                            yield (iref,iatom,times,npts,cnt)
 
-                key = 'vbr-' + str(iref+1) + '-' + str(iatom+1) + '-' + str(self.vbrotate) + '+'
-                for times,system in enumerate(self.refsys[iref][iatom]):
-                    key1 = key + str(times) + '-'
 
-                    for npts in self.overall_pars[iref][iatom]:
-                        key2 = key1 + str(npts) + '-'
-                        for kw in self.overall_pars[iref][iatom][npts]:
-                            want = 'more' if kw['ratio'] > 1.0 else 'less'
-                            key3 = key2 + want + '-' + '+'.join([str(i+1) for i in kw['ipts']])
+
+    def calc_kw(self,key):
+        iref,iatom,times,npts,cnt = key
+        return self.overall_pars[iref][iatom][npts][cnt]
+
 
 
-                            VaryBond.__init__(self, system, **kw)
-                            VaryBond.run(self)
+    def calc_task(self,key):
+        iref,iatom,times,npts,cnt = key
+        system = self.refsys[iref][iatom][times]
 
-                            if self.bcon is not None and len(self.bcon) != 0:
-                                FixBonds.run(self)
-                            if self.nbcon is not None and len(self.nbcon) != 0:
-                                FixNonBonds.run(self)
+        VaryBond.__init__(self, system, **self.calc_kw(key))
+        VaryBond.run(self)
 
-                            self.totsysnews[key3] = self.sysnew
-                            key3 += '-m' + str(len(self.sysnew))
-                            sf = SaveFileSystemMany(self.sysnew,fname=key3)
-                            sf.run()
+        if self.bcon is not None and len(self.bcon) != 0:
+            FixBonds.run(self)
+        if self.nbcon is not None and len(self.nbcon) != 0:
+            FixNonBonds.run(self)
+        return self.sysnew
 
 
-        totnm = 0
-        for k in self.totsysnews:
-            totnm += len(self.totsysnews[k])
-        print(totnm)
+
+    def run(self,sink=None,nproc=None,chunk=None):
+        """
+        Args:
+            sink (callable) : sink(key,kw,sysnew), streaming results,
+                              key = (iref, iatom, times, npts, cnt)
+                              default, self.save_sysnew
+            nproc (int)     : number of processes, default 1
+            chunk (int)     : number of parameter sets dispatched each time
+
+        Attributes:
+            totnums : { name : number of generations }, only for default sink
+        """
+        self.totnums = {}
+        super().run(sink=self.save_sysnew if sink is None else sink,nproc=nproc,chunk=chunk)
+        if sink is None: print(sum(self.totnums.values()))
+
+
+
+    def save_sysnew(self,key,kw,sysnew):
+        """save results to file at once, only numbers are kept"""
+        # name format:
+        #   iref-iatom-vbrotate+times-varyatnums-more/less-target+target+target
+        iref,iatom,times,npts,cnt = key
+        want = 'more' if kw['ratio'] > 1.0 else 'less'
+        name = 'vbr-' + str(iref+1) + '-' + str(iatom+1) + '-' + str(self.vbrotate) + '+'
+        name += str(times) + '-' + str(npts) + '-'
+        name += want + '-' + '+'.join([str(i+1) for i in kw['ipts']])
+
+        self.totnums[name] = len(sysnew)
+        name += '-m' + str(len(sysnew))
+        sf = SaveFileSystemMany(sysnew,fname=name)
+        sf.run()
 
 
 